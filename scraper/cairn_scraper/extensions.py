@@ -0,0 +1,43 @@
+import logging
+import os
+import time
+
+from scrapy import signals
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Log the time from start-up to the first request sent to Cairn.
+
+    Measured from BOOTSTRAP_STARTED_AT (set by scripts/bootstrap.py before
+    waiting for the services) when present, else from the crawler start.
+    """
+
+    def __init__(self, stats, started_at):
+        self.stats = stats
+        self.started_at = started_at
+        self.first_request_seen = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        started_at = os.getenv("BOOTSTRAP_STARTED_AT")
+        extension = cls(crawler.stats, float(started_at) if started_at else time.time())
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(
+            extension.request_reached_downloader, signal=signals.request_reached_downloader
+        )
+        return extension
+
+    def spider_opened(self, spider):
+        elapsed = time.time() - self.started_at
+        self.stats.set_value("startup/spider_opened_s", round(elapsed, 3))
+        logger.info("Spider opened %.2f s after start-up", elapsed)
+
+    def request_reached_downloader(self, request, spider):
+        if self.first_request_seen:
+            return
+        self.first_request_seen = True
+        elapsed = time.time() - self.started_at
+        self.stats.set_value("startup/time_to_first_request_s", round(elapsed, 3))
+        logger.info("Time to first request: %.2f s (%s)", elapsed, request.url)
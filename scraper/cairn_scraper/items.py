@@ -1,19 +1,79 @@
-import scrapy
-
-
-class OuvrageItem(scrapy.Item):
-    title = scrapy.Field()
-    subtitle = scrapy.Field()
-    authors = scrapy.Field()
-    collection = scrapy.Field()
-    editeur = scrapy.Field()
-    date_parution = scrapy.Field()
-    date_mise_en_ligne = scrapy.Field()
-    pages = scrapy.Field()
-    price = scrapy.Field()
-    description = scrapy.Field()
-    isbn = scrapy.Field()
-    theme = scrapy.Field()
-    image_url = scrapy.Field()
-    url = scrapy.Field()
-    doc_id = scrapy.Field()
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from bson import encode
+from bson.raw_bson import RawBSONDocument
+
+FIELDS = (
+    "title", "subtitle", "authors", "collection", "editeur",
+    "date_parution", "date_mise_en_ligne", "pages", "price", "description",
+    "isbn", "theme", "image_url", "url", "doc_id",
+)
+# Bump when the fields or their normalization change: book pages are then
+# parsed again instead of being revalidated (ConditionalRequestsMiddleware).
+SCHEMA_VERSION = 3
+
+# Scraped values before normalization (set by NormalizationPipeline)
+RAW_FIELDS = ("authors_raw", "editeur_raw", "collection_raw")
+
+
+@dataclass
+class OuvrageItem:
+    """A scraped book with a fixed schema.
+
+    Validated once when built; each wire format (JSON for Elasticsearch,
+    BSON for MongoDB) is encoded at most once and cached on the item, so the
+    pipelines share the same buffers instead of each copying the item.
+    """
+
+    # Declared by hand (rather than slots=True) to make room for the
+    # encoded buffers, which are not part of the schema.
+    __slots__ = (*FIELDS, *RAW_FIELDS, "_json", "_bson")
+
+    title: str
+    subtitle: str
+    authors: list[str]
+    collection: str
+    editeur: str
+    date_parution: Optional[str]
+    date_mise_en_ligne: Optional[str]
+    pages: Optional[int]
+    price: Optional[float]
+    description: str
+    isbn: str
+    theme: str
+    image_url: str
+    url: str
+    doc_id: str
+
+    def __post_init__(self):
+        if not self.doc_id:
+            raise ValueError(f"Item without doc_id: {self.url}")
+        self.authors = [str(author) for author in self.authors or []]
+        self.pages = int(self.pages) if self.pages is not None else None
+        self.price = float(self.price) if self.price is not None else None
+        for name in RAW_FIELDS:
+            setattr(self, name, None)
+        self._json = None
+        self._bson = None
+
+    def to_dict(self):
+        doc = {name: getattr(self, name) for name in FIELDS}
+        for name in RAW_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                doc[name] = value
+        return doc
+
+    def to_json(self):
+        """UTF-8 JSON body, sent as is by ElasticsearchPipeline."""
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), ensure_ascii=False).encode()
+        return self._json
+
+    def to_bson(self):
+        """Raw BSON document, written as is by MongoPipeline."""
+        if self._bson is None:
+            self._bson = RawBSONDocument(encode(self.to_dict()))
+        return self._bson
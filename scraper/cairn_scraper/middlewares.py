@@ -0,0 +1,155 @@
+import hashlib
+import logging
+from urllib.parse import urlparse
+
+from pymongo import MongoClient, ReplaceOne
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+
+from cairn_scraper.items import SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def doc_id_from_url(url):
+    return urlparse(url).path.strip("/")
+
+
+class ConditionalRequestsMiddleware:
+    """Revalidate book pages instead of downloading them again.
+
+    Validators of each page (ETag, Last-Modified, and a hash of the body for
+    pages served without either) are kept per doc_id in the `validators`
+    collection. Requests flagged with meta["revalidate"] carry
+    If-None-Match / If-Modified-Since; a 304, or a 200 whose body hash is
+    unchanged, sets meta["not_modified"] so the spider skips parsing and the
+    pipelines. Validators (with the page size and parse time, reported as
+    saved on revalidation) are only saved for pages whose item went through
+    every pipeline, so a dropped item is fetched in full next time.
+
+    Validators are tied to the ES index and the item schema: those saved for
+    another index or SCHEMA_VERSION are ignored, and scripts/init_es_index.py
+    clears them when it creates the index, so a new index is filled again.
+    """
+
+    def __init__(self, crawler, mongo_uri, es_index):
+        self.stats = crawler.stats
+        self.mongo_uri = mongo_uri
+        self.es_index = es_index
+        self.validators = {}
+        self.updates = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CONDITIONAL_REQUESTS"):
+            raise NotConfigured("CONDITIONAL_REQUESTS is disabled")
+        middleware = cls(crawler, crawler.settings.get("MONGO_URI"), crawler.settings.get("ES_INDEX"))
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        parsed = urlparse(self.mongo_uri)
+        self.client = MongoClient(self.mongo_uri)
+        self.collection = self.client[parsed.path.lstrip("/") or "cairn"]["validators"]
+        self.validators = {
+            doc["doc_id"]: doc
+            for doc in self.collection.find(
+                {"index": self.es_index, "version": SCHEMA_VERSION}, projection={"_id": False}
+            )
+        }
+        logger.info("Loaded validators for %d pages", len(self.validators))
+
+    def process_request(self, request):
+        if not request.meta.get("revalidate"):
+            return None
+        known = self.validators.get(doc_id_from_url(request.url))
+        if known:
+            if known.get("etag"):
+                request.headers.setdefault(b"If-None-Match", known["etag"])
+            if known.get("last_modified"):
+                request.headers.setdefault(b"If-Modified-Since", known["last_modified"])
+        return None
+
+    def process_response(self, request, response):
+        if not request.meta.get("revalidate"):
+            return response
+        doc_id = doc_id_from_url(request.url)
+        known = self.validators.get(doc_id)
+
+        if response.status == 304 and known:
+            self.stats.inc_value("revalidation/not_modified")
+            self.stats.inc_value("revalidation/bytes_saved", known.get("size", 0))
+            self.stats.inc_value("revalidation/parse_ms_saved", known.get("parse_ms", 0))
+            request.meta["not_modified"] = True
+            return response
+
+        if response.status == 200:
+            etag = response.headers.get(b"ETag")
+            last_modified = response.headers.get(b"Last-Modified")
+            body_hash = hashlib.blake2b(response.body, digest_size=16).hexdigest()
+            if known and not (etag or last_modified) and known.get("body_hash") == body_hash:
+                # Downloaded anyway, but parsing and storage are skipped
+                self.stats.inc_value("revalidation/unchanged_body")
+                self.stats.inc_value("revalidation/parse_ms_saved", known.get("parse_ms", 0))
+                request.meta["not_modified"] = True
+                return response
+            self.stats.inc_value("revalidation/full_downloads")
+            self.updates[doc_id] = {
+                "doc_id": doc_id,
+                "etag": etag.decode() if etag else None,
+                "last_modified": last_modified.decode() if last_modified else None,
+                "body_hash": body_hash,
+                "size": len(response.body),
+                "index": self.es_index,
+                "version": SCHEMA_VERSION,
+            }
+        return response
+
+    def item_scraped(self, item, response, spider):
+        validators = self.updates.get(item.doc_id)
+        if validators is not None:
+            validators["parse_ms"] = round(response.meta.get("parse_ms", 0), 1)
+            validators["stored"] = True
+
+    def spider_closed(self, spider):
+        writes = [
+            ReplaceOne({"doc_id": doc_id}, validators, upsert=True)
+            for doc_id, validators in self.updates.items()
+            if validators.pop("stored", False)
+        ]
+        if writes:
+            self.collection.bulk_write(writes, ordered=False)
+        logger.info("Saved validators for %d pages", len(writes))
+        self.client.close()
+
+
+class ListingPagesMiddleware:
+    """Drop listing pages past the last page known for their theme.
+
+    With SPECULATIVE_LISTING, the listing pages of the previous run are all
+    scheduled when the crawl starts. Once the real pagination or an empty
+    page shows that a theme got shorter, its pages past the end still
+    waiting in the scheduler are dropped here instead of being downloaded.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("SPECULATIVE_LISTING"):
+            raise NotConfigured("SPECULATIVE_LISTING is disabled")
+        return cls(crawler)
+
+    def process_request(self, request):
+        if not request.meta.get("listing"):
+            return None
+        theme, page = request.cb_kwargs["theme"], request.cb_kwargs["page"]
+        last_page = self.crawler.spider.page_counts.get(theme, {}).get("last_page")
+        if last_page is not None and page > last_page:
+            self.stats.inc_value("listing/dropped_pages")
+            raise IgnoreRequest(f"listing page {page} of {theme} is past its last page ({last_page})")
+        return None
@@ -0,0 +1,133 @@
+"""Canonical forms of authors, publishers and collections.
+
+Scraped values come with case, accent, spacing and name-order variants
+("Dupont, Jean", "Jean  DUPONT", "Jean Dupont"), each one a separate term
+in the ES keyword dictionaries and facets. Every value gets a folded key;
+the first form seen for a key becomes its canonical form, and the mapping
+is persisted in the `aliases` collection (editing `canonical` there is how
+a mapping is corrected by hand).
+"""
+
+import re
+import sys
+import unicodedata
+
+from pymongo import UpdateOne
+
+
+def fold(value):
+    """Lowercase, accents and punctuation removed, spaces collapsed."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", stripped.casefold()).split())
+
+
+def first_last(name):
+    """'Dupont, Jean' -> 'Jean Dupont'; any other order is kept as is."""
+    name = " ".join(name.split())
+    if name.count(",") == 1:
+        last, first = (part.strip() for part in name.split(","))
+        name = f"{first} {last}"
+    return name
+
+
+def author_key(name):
+    # Only the explicit "Last, First" form is reordered: "Martin Paul" and
+    # "Paul Martin" may well be two people
+    return fold(first_last(name))
+
+
+def capitalize_word(word):
+    """'DUPONT' -> 'Dupont', 'JEAN-PIERRE' -> 'Jean-Pierre'; mixed case is kept."""
+    if not word.isupper() or len(word) < 2:
+        return word
+    return "-".join(part.capitalize() for part in word.split("-"))
+
+
+def display_author(name):
+    """'Dupont, Jean' -> 'Jean Dupont'; 'Jean DUPONT' -> 'Jean Dupont'."""
+    return " ".join(capitalize_word(word) for word in first_last(name).split())
+
+
+def display_label(value):
+    return " ".join(value.split())
+
+
+# Bump when a key function changes: aliases stored under older keys are
+# dropped when the table is loaded.
+KEY_VERSION = 2
+
+# field -> (key function, canonical form of a first-seen value)
+FIELD_RULES = {
+    "authors": (author_key, display_author),
+    "editeur": (fold, display_label),
+    "collection": (fold, display_label),
+}
+
+
+class AliasTable:
+    """Persisted {(field, key): canonical} mapping with the raw variants seen."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        collection.delete_many({"version": {"$ne": KEY_VERSION}})
+        self.canonical_forms = {}
+        self.variants = set()
+        for doc in collection.find({}, projection={"_id": False}):
+            key = (doc["field"], doc["key"])
+            self.canonical_forms[key] = sys.intern(doc["canonical"])
+            self.variants.update((key, variant) for variant in doc.get("variants", []))
+        self.new_variants = {}
+        self.raw_seen = {field: set() for field in FIELD_RULES}
+
+    def canonical(self, field, raw):
+        key_of, display = FIELD_RULES[field]
+        key = (field, key_of(raw))
+        canonical = self.canonical_forms.get(key)
+        if canonical is None:
+            canonical = self.canonical_forms[key] = sys.intern(display(raw))
+        if (key, raw) not in self.variants:
+            self.variants.add((key, raw))
+            self.new_variants.setdefault(key, []).append(raw)
+        self.raw_seen[field].add(raw)
+        return canonical
+
+    def normalize(self, authors, editeur, collection):
+        """Canonical (authors, editeur, collection) of one book's scraped values."""
+        return (
+            list(dict.fromkeys(
+                self.canonical("authors", author) for author in authors if author.strip()
+            )),
+            self.canonical("editeur", editeur) if editeur.strip() else "",
+            self.canonical("collection", collection) if collection.strip() else "",
+        )
+
+    def cardinality(self):
+        """{field: (distinct raw values, distinct canonical forms)} seen so far."""
+        counts = {}
+        for field, raw in self.raw_seen.items():
+            key_of = FIELD_RULES[field][0]
+            canonical = {self.canonical_forms[(field, key_of(value))] for value in raw}
+            counts[field] = (len(raw), len(canonical))
+        return counts
+
+    def save(self):
+        """Upsert the new keys and variants; existing canonical forms are kept."""
+        writes = [
+            UpdateOne(
+                {"field": field, "key": key},
+                {
+                    "$setOnInsert": {
+                        "canonical": self.canonical_forms[(field, key)],
+                        "version": KEY_VERSION,
+                    },
+                    "$addToSet": {"variants": {"$each": variants}},
+                },
+                upsert=True,
+            )
+            for (field, key), variants in self.new_variants.items()
+        ]
+        if writes:
+            self.collection.bulk_write(writes, ordered=False)
+        self.new_variants = {}
+        return len(writes)
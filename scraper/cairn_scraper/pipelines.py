@@ -1,14 +1,29 @@
 import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
 from urllib.parse import urlparse
 
-from itemadapter import ItemAdapter
-from pymongo import MongoClient, ReplaceOne
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pymongo import MongoClient, ReplaceOne, ReturnDocument
 from elasticsearch import Elasticsearch
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from cairn_scraper.normalization import AliasTable
 
 logger = logging.getLogger(__name__)
 
 
-class MongoPipeline:
+class NormalizationPipeline:
+    """Map authors, editeur and collection to their canonical forms.
+
+    Runs before the stores: MongoDB, ES and the Parquet export all get the
+    canonical values, and the scraped ones are kept in *_raw fields.
+    """
+
     def __init__(self, mongo_uri):
         self.mongo_uri = mongo_uri
 
@@ -16,53 +31,357 @@ class MongoPipeline:
     def from_crawler(cls, crawler):
         return cls(mongo_uri=crawler.settings.get("MONGO_URI"))
 
+    def open_spider(self):
+        parsed = urlparse(self.mongo_uri)
+        self.client = MongoClient(self.mongo_uri)
+        collection = self.client[parsed.path.lstrip("/") or "cairn"]["aliases"]
+        collection.create_index([("field", 1), ("key", 1)], unique=True)
+        self.aliases = AliasTable(collection)
+
+    def close_spider(self):
+        saved = self.aliases.save()
+        for field, (raw, canonical) in self.aliases.cardinality().items():
+            logger.info("Normalized %s: %d raw values -> %d canonical", field, raw, canonical)
+        logger.info("NormalizationPipeline saved %d new alias entries", saved)
+        self.client.close()
+
+    def process_item(self, item):
+        item.authors_raw, item.editeur_raw, item.collection_raw = (
+            item.authors, item.editeur, item.collection
+        )
+        item.authors, item.editeur, item.collection = self.aliases.normalize(
+            item.authors, item.editeur, item.collection
+        )
+        return item
+
+
+class MongoPipeline:
+    """Upsert books into MongoDB and keep the catalogue history.
+
+    Each upsert returns the previous version of the book, which yields its
+    change events (added, price_changed) at no extra round trip; they are
+    appended in batches to the `history` collection. At the end of a run,
+    a summary (per-theme counts, durations and events) goes to `crawl_runs`.
+    Books not seen by a complete, unlimited crawl are flagged `removed_at`
+    and get a `removed` event. A crawl run with SCRAPE_MAX_PAGES or
+    SCRAPE_MAX_ITEMS_PER_THEME set (the default caps items per theme) is
+    incomplete: removal detection is skipped, and the run says so in the
+    logs and in its summary.
+    """
+
+    HISTORY_BATCH_SIZE = 500
+    LIMIT_SETTINGS = ("SCRAPE_MAX_PAGES", "SCRAPE_MAX_ITEMS_PER_THEME")
+
+    def __init__(self, mongo_uri, limits=None):
+        self.mongo_uri = mongo_uri
+        # With page or item limits, unseen books are not necessarily gone
+        self.limits = {name: value for name, value in (limits or {}).items() if value >= 0}
+        self.complete_crawl = not self.limits
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            mongo_uri=crawler.settings.get("MONGO_URI"),
+            limits={name: crawler.settings.getint(name, -1) for name in cls.LIMIT_SETTINGS},
+        )
+        # The finish reason is only known once the spider is closed
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
     def open_spider(self):
         parsed = urlparse(self.mongo_uri)
         db_name = parsed.path.lstrip("/") or "cairn"
         self.client = MongoClient(self.mongo_uri)
         self.db = self.client[db_name]
         self.collection = self.db["ouvrages"]
+        self.history = self.db["history"]
+        self.runs = self.db["crawl_runs"]
+        self.collection.create_index("doc_id")
+        self.history.create_index([("doc_id", 1), ("run_id", 1)])
+
+        self.started_at = datetime.now(timezone.utc)
+        self.run_id = self.started_at.strftime("%Y%m%dT%H%M%SZ")
+        self.seen = set()
+        self.events = []
+        self.themes = defaultdict(lambda: {
+            "items": 0, "unchanged": 0, "added": 0, "price_changed": 0, "removed": 0,
+            "first_item_at": None, "last_item_at": None,
+        })
         logger.info("MongoPipeline connected to %s / %s", self.mongo_uri, db_name)
+        if not self.complete_crawl:
+            logger.warning(
+                "Crawl limited by %s: removed books will not be detected "
+                "(set these settings to -1 for a complete crawl)",
+                ", ".join(f"{name}={value}" for name, value in self.limits.items()),
+            )
 
     def close_spider(self):
-        self.client.close()
+        self._flush_events()
 
     def process_item(self, item):
-        adapter = ItemAdapter(item)
-        doc = adapter.asdict()
-        self.collection.replace_one(
-            {"doc_id": doc["doc_id"]},
-            doc,
+        previous = self.collection.find_one_and_replace(
+            {"doc_id": item.doc_id},
+            item.to_bson(),
+            projection={"_id": False, "price": True, "removed_at": True},
             upsert=True,
+            return_document=ReturnDocument.BEFORE,
         )
+
+        now = datetime.now(timezone.utc)
+        theme = self.themes[item.theme]
+        theme["items"] += 1
+        theme["first_item_at"] = theme["first_item_at"] or now
+        theme["last_item_at"] = now
+        self.seen.add(item.doc_id)
+
+        if previous is None or "removed_at" in previous:
+            self._event(item.doc_id, item.theme, "added", now, price=item.price)
+        elif previous.get("price") != item.price:
+            self._event(
+                item.doc_id, item.theme, "price_changed", now,
+                price=item.price, old_price=previous.get("price"),
+            )
         return item
 
+    def spider_closed(self, spider, reason):
+        finished_at = datetime.now(timezone.utc)
+        # Revalidated as unchanged (304): still in the catalogue
+        for doc_id, theme in getattr(spider, "unchanged", {}).items():
+            self.seen.add(doc_id)
+            self.themes[theme]["unchanged"] += 1
+        if reason == "finished" and self.complete_crawl:
+            self._record_removals(finished_at)
+        else:
+            logger.warning(
+                "Removal detection skipped: %s",
+                "crawl limited" if reason == "finished" else f"crawl {reason}",
+            )
+        self._flush_events()
+
+        themes = {}
+        for name, theme in self.themes.items():
+            first, last = theme.pop("first_item_at"), theme.pop("last_item_at")
+            theme["duration_s"] = round((last - first).total_seconds(), 1) if first else 0
+            theme["catalogue"] = self.collection.count_documents(
+                {"theme": name, "removed_at": {"$exists": False}}
+            )
+            # Listing pagination, used by the next run to fetch pages speculatively
+            theme.update(getattr(spider, "page_counts", {}).get(name, {}))
+            themes[name] = theme
+        self.runs.insert_one({
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": finished_at,
+            "duration_s": round((finished_at - self.started_at).total_seconds(), 1),
+            "finish_reason": reason,
+            "complete": self.complete_crawl,
+            "limits": self.limits,
+            "items": sum(theme["items"] for theme in themes.values()),
+            "themes": themes,
+        })
+        logger.info("MongoPipeline recorded crawl run %s (%s)", self.run_id, reason)
+        self.client.close()
+
+    def _record_removals(self, now):
+        live = self.collection.find(
+            {"removed_at": {"$exists": False}}, projection={"_id": False, "doc_id": True, "theme": True}
+        )
+        removed = [doc for doc in live if doc["doc_id"] not in self.seen]
+        for doc in removed:
+            self._event(doc["doc_id"], doc["theme"], "removed", now)
+        if removed:
+            self.collection.update_many(
+                {"doc_id": {"$in": [doc["doc_id"] for doc in removed]}},
+                {"$set": {"removed_at": now}},
+            )
+
+    def _event(self, doc_id, theme, event, at, **values):
+        self.themes[theme][event] += 1
+        self.events.append({
+            "run_id": self.run_id, "doc_id": doc_id, "theme": theme,
+            "event": event, "at": at, **values,
+        })
+        if len(self.events) >= self.HISTORY_BATCH_SIZE:
+            self._flush_events()
+
+    def _flush_events(self):
+        if self.events:
+            self.history.insert_many(self.events, ordered=False)
+            self.events = []
+
 
 class ElasticsearchPipeline:
-    def __init__(self, es_host, es_index):
+    INDEX_POLL_INTERVAL = 0.2
+
+    def __init__(self, es_host, es_index, es_routing="doc_id", wait_for_index=0):
         self.es_host = es_host
         self.es_index = es_index
+        self.route_by_theme = es_routing == "theme"
+        self.wait_for_index = wait_for_index
 
     @classmethod
     def from_crawler(cls, crawler):
         return cls(
             es_host=crawler.settings.get("ES_HOST"),
             es_index=crawler.settings.get("ES_INDEX"),
+            es_routing=crawler.settings.get("ES_ROUTING", "doc_id"),
+            wait_for_index=crawler.settings.getfloat("ES_WAIT_FOR_INDEX"),
         )
 
     def open_spider(self):
         self.es = Elasticsearch(self.es_host)
+        if self.wait_for_index:
+            self._await_index()
         logger.info("ElasticsearchPipeline connected to %s", self.es_host)
 
+    def _await_index(self):
+        """Wait until the index is created with its mapping.
+
+        The index is initialized while the crawler starts; writing first
+        would create it with a dynamic mapping. Pipelines are opened before
+        any request is scheduled, so polling here stalls nothing, and by
+        then the index almost always exists.
+        """
+        deadline = time.monotonic() + self.wait_for_index
+        while not self.es.indices.exists(index=self.es_index):
+            if time.monotonic() > deadline:
+                logger.error(
+                    "Index %s still missing after %.0f s, writing anyway",
+                    self.es_index, self.wait_for_index,
+                )
+                return
+            time.sleep(self.INDEX_POLL_INTERVAL)
+
     def close_spider(self):
         self.es.close()
 
     def process_item(self, item):
-        adapter = ItemAdapter(item)
-        doc = adapter.asdict()
+        # Pre-encoded JSON body: the client sends bytes without re-serializing
         self.es.index(
             index=self.es_index,
-            id=doc["doc_id"],
-            document=doc,
+            id=item.doc_id,
+            document=item.to_json(),
+            routing=item.theme if self.route_by_theme else None,
+        )
+        return item
+
+
+def parse_date(value):
+    """Cairn dates ("12/03/2021", "03/2021" or "2021") as datetime.date."""
+    for fmt in ("%d/%m/%Y", "%m/%Y", "%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+# theme is not a column: it is the partition key (theme=... directories)
+PARQUET_SCHEMA = pa.schema([
+    ("doc_id", pa.string()),
+    ("title", pa.string()),
+    ("subtitle", pa.string()),
+    ("authors", pa.list_(pa.string())),
+    ("editeur", pa.string()),
+    ("collection", pa.string()),
+    ("date_parution", pa.date32()),
+    ("date_mise_en_ligne", pa.date32()),
+    ("pages", pa.int32()),
+    ("price", pa.float64()),
+    ("isbn", pa.string()),
+    ("url", pa.string()),
+    ("image_url", pa.string()),
+    ("description", pa.string()),
+])
+
+
+class ParquetPipeline:
+    """Write each crawl as a Parquet dataset for analytics.
+
+    Layout: <PARQUET_EXPORT_DIR>/crawl=<UTC timestamp>/theme=<theme>/part-0.parquet
+    (hive partitioning, readable with pyarrow.dataset, DuckDB, pandas...).
+    Rows are buffered per theme and flushed as one row group every
+    PARQUET_ROW_GROUP_SIZE items, so memory stays bounded whatever the crawl size.
+
+    Books revalidated as unchanged are not parsed again: they are read back
+    from MongoDB at the end of the crawl, so each snapshot is complete.
+    """
+
+    READ_BACK_BATCH_SIZE = 1000
+
+    def __init__(self, crawler, export_dir, row_group_size, mongo_uri):
+        self.crawler = crawler
+        self.export_dir = export_dir
+        self.row_group_size = row_group_size
+        self.mongo_uri = mongo_uri
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        export_dir = crawler.settings.get("PARQUET_EXPORT_DIR")
+        if not export_dir:
+            raise NotConfigured("PARQUET_EXPORT_DIR is not set")
+        return cls(
+            crawler,
+            export_dir=export_dir,
+            row_group_size=crawler.settings.getint("PARQUET_ROW_GROUP_SIZE", 5000),
+            mongo_uri=crawler.settings.get("MONGO_URI"),
         )
+
+    def open_spider(self):
+        crawl = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.crawl_dir = os.path.join(self.export_dir, f"crawl={crawl}")
+        self.buffers = {}
+        self.writers = {}
+        self.rows = 0
+
+    def close_spider(self):
+        unchanged = list(getattr(self.crawler.spider, "unchanged", {}))
+        if unchanged:
+            self._read_back(unchanged)
+        for theme in list(self.buffers):
+            self._flush(theme)
+        for writer in self.writers.values():
+            writer.close()
+        logger.info(
+            "ParquetPipeline wrote %d rows (%d unchanged, read back from MongoDB) to %s",
+            self.rows, len(unchanged), self.crawl_dir,
+        )
+
+    def process_item(self, item):
+        self._add(item.to_dict())
         return item
+
+    def _read_back(self, doc_ids):
+        parsed = urlparse(self.mongo_uri)
+        client = MongoClient(self.mongo_uri)
+        collection = client[parsed.path.lstrip("/") or "cairn"]["ouvrages"]
+        projection = {"_id": False, **{name: True for name in PARQUET_SCHEMA.names}, "theme": True}
+        for start in range(0, len(doc_ids), self.READ_BACK_BATCH_SIZE):
+            batch = doc_ids[start:start + self.READ_BACK_BATCH_SIZE]
+            for doc in collection.find({"doc_id": {"$in": batch}}, projection=projection):
+                self._add(doc)
+        client.close()
+
+    def _add(self, row):
+        theme = row.pop("theme")
+        row["date_parution"] = parse_date(row.get("date_parution"))
+        row["date_mise_en_ligne"] = parse_date(row.get("date_mise_en_ligne"))
+        buffer = self.buffers.setdefault(theme, [])
+        buffer.append(row)
+        if len(buffer) >= self.row_group_size:
+            self._flush(theme)
+
+    def _flush(self, theme):
+        rows = self.buffers.pop(theme, None)
+        if not rows:
+            return
+        writer = self.writers.get(theme)
+        if writer is None:
+            directory = os.path.join(self.crawl_dir, f"theme={theme}")
+            os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(
+                os.path.join(directory, "part-0.parquet"), PARQUET_SCHEMA, compression="zstd"
+            )
+            self.writers[theme] = writer
+        writer.write_table(pa.Table.from_pylist(rows, schema=PARQUET_SCHEMA))
+        self.rows += len(rows)
@@ -0,0 +1,130 @@
+"""Sampling profiler for crawl runs.
+
+A background thread snapshots the reactor thread's stack every
+PROFILE_INTERVAL_MS and counts identical stacks. Nothing is traced between
+samples, so the overhead only depends on the interval (the sampler's own
+time is measured and logged). At the end of the crawl the stacks are
+written in folded format ("frame;frame;frame count"), ready for
+flamegraph.pl, inferno or speedscope, and a per-category summary is logged.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 128
+
+# First match wins: a selector call made from parse_ouvrage counts as
+# "selectors", the rest of parse_ouvrage as "parse_ouvrage".
+CATEGORIES = [
+    ("selectors", ("/parsel/", "/scrapy/selector/", "/lxml/")),
+    ("pipelines: elasticsearch", ("/elasticsearch/", "/elastic_transport/")),
+    ("pipelines: mongodb", ("/pymongo/", "/bson/")),
+    ("pipelines", ("cairn_scraper/pipelines.py",)),
+    ("parse_ouvrage", ("parse_ouvrage",)),
+    ("parse (listing)", ("OuvragesSpider.parse",)),
+    ("middlewares", ("cairn_scraper/middlewares.py",)),
+    ("download", ("/scrapy/core/downloader/", "/twisted/web/")),
+]
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.overhead = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._record(frame)
+            self.overhead += time.perf_counter() - start
+
+    def _record(self, frame):
+        paths, labels = [], []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            paths.append(f"{code.co_filename}:{code.co_qualname}")
+            labels.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(labels))] += 1
+        self.categories[self._category(paths)] += 1
+
+    @staticmethod
+    def _category(paths):
+        for name, markers in CATEGORIES:
+            if any(marker in path for path in paths for marker in markers):
+                return name
+        return "other"
+
+    def write_folded(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class SamplingProfiler:
+    """Scrapy extension profiling a whole crawl (PROFILE=1)."""
+
+    def __init__(self, profile_dir, interval_ms):
+        self.profile_dir = profile_dir
+        self.interval = interval_ms / 1000
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("PROFILE"):
+            raise NotConfigured("PROFILE is disabled")
+        extension = cls(
+            profile_dir=crawler.settings.get("PROFILE_DIR"),
+            interval_ms=crawler.settings.getfloat("PROFILE_INTERVAL_MS", 10),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        # Signals are sent from the reactor thread, where the crawl runs
+        self.sampler = StackSampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+
+    def spider_closed(self, spider):
+        sampler = self.sampler
+        sampler.stop()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(self.profile_dir, f"crawl-{spider.name}-{stamp}.folded")
+        sampler.write_folded(path)
+
+        total = sum(sampler.categories.values()) or 1
+        logger.info(
+            "Profile: %d samples over %.0f s (sampler overhead %.2f%%) written to %s",
+            total, sampler.elapsed, 100 * sampler.overhead / sampler.elapsed, path,
+        )
+        for name, count in sampler.categories.most_common():
+            logger.info("Profile:   %-26s %5.1f%%", name, 100 * count / total)
@@ -15,20 +15,55 @@ DOWNLOAD_DELAY = float(os.getenv("SCRAPE_DOWNLOAD_DELAY", 1))
 CONCURRENT_REQUESTS = 8
 CONCURRENT_REQUESTS_PER_DOMAIN = 2
 
-# Scraping limits (-1 = no limit)
+# Scraping limits (-1 = no limit). A limited crawl does not see the whole
+# catalogue, so MongoPipeline cannot tell which books were removed: removal
+# detection only runs when both are -1.
 SCRAPE_MAX_PAGES = int(os.getenv("SCRAPE_MAX_PAGES", -1))
 SCRAPE_MAX_ITEMS_PER_THEME = int(os.getenv("SCRAPE_MAX_ITEMS_PER_THEME", 200))
 
 # Pipelines
 ITEM_PIPELINES = {
+    "cairn_scraper.pipelines.NormalizationPipeline": 0,
     "cairn_scraper.pipelines.MongoPipeline": 1,
     "cairn_scraper.pipelines.ElasticsearchPipeline": 2,
+    "cairn_scraper.pipelines.ParquetPipeline": 3,
+}
+
+# Parquet dataset of each crawl, partitioned by theme (disabled when empty)
+PARQUET_EXPORT_DIR = os.getenv("PARQUET_EXPORT_DIR", "")
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", 5000))
+
+# Request the listing pages of the previous run right away, instead of
+# waiting for page 1 to read the pagination
+SPECULATIVE_LISTING = os.getenv("SPECULATIVE_LISTING", "1") == "1"
+
+# Conditional GETs on book pages already crawled (validators kept in MongoDB)
+CONDITIONAL_REQUESTS = os.getenv("CONDITIONAL_REQUESTS", "1") == "1"
+DOWNLOADER_MIDDLEWARES = {
+    # drops speculative listing pages past the end of their theme
+    "cairn_scraper.middlewares.ListingPagesMiddleware": 570,
+    # below HttpCompressionMiddleware (590): sees decompressed bodies
+    "cairn_scraper.middlewares.ConditionalRequestsMiddleware": 580,
+}
+
+# Sampling profiler (flamegraph-ready .folded files in PROFILE_DIR)
+PROFILE = os.getenv("PROFILE", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 10))
+EXTENSIONS = {
+    "cairn_scraper.profiling.SamplingProfiler": 0,
+    "cairn_scraper.extensions.StartupTimer": 0,
 }
 
 # Mongo / ES
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/cairn")
 ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
 ES_INDEX = os.getenv("ES_INDEX", "cairn_ouvrages")
+# "theme" routes each book to the shard of its theme (see scripts/init_es_index.py)
+ES_ROUTING = os.getenv("ES_ROUTING", "doc_id")
+# Seconds the ES pipeline waits for the index when opened, before any request
+# (0: no wait); set by scripts/bootstrap.py, which creates it during start-up
+ES_WAIT_FOR_INDEX = float(os.getenv("ES_WAIT_FOR_INDEX", 0))
 
 # Logging
 LOG_LEVEL = "INFO"
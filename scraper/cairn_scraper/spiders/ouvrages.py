@@ -1,7 +1,10 @@
 import re
+import time
 from urllib.parse import urlparse, urlencode, urlunparse, parse_qs
 
 import scrapy
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
 
 from cairn_scraper.items import OuvrageItem
 
@@ -28,24 +31,53 @@ class OuvragesSpider(scrapy.Spider):
         spider.max_pages = crawler.settings.getint("SCRAPE_MAX_PAGES", -1)
         spider.max_per_theme = crawler.settings.getint("SCRAPE_MAX_ITEMS_PER_THEME", -1)
         spider.theme_counts = {}
+        # doc_id -> theme of the books revalidated as unchanged (not re-parsed)
+        spider.unchanged = {}
+        # theme -> {"last_page", "per_page"}: seen in this run (saved with the
+        # run summary by MongoPipeline) and in the previous one
+        spider.page_counts = {}
+        spider.known_page_counts = {}
+        if crawler.settings.getbool("SPECULATIVE_LISTING"):
+            spider.known_page_counts = spider._load_page_counts(crawler.settings.get("MONGO_URI"))
+        # theme -> highest listing page already requested
+        spider.scheduled_pages = {}
         return spider
 
     async def start(self):
         for theme_name, url in self.THEME_URLS:
             self.theme_counts[theme_name] = 0
+            self.scheduled_pages[theme_name] = 1
             yield scrapy.Request(
                 url,
                 callback=self.parse,
                 cb_kwargs={"theme": theme_name, "page": 1},
             )
+            # Pages of the previous run, without waiting for page 1
+            known = self.known_page_counts.get(theme_name)
+            if known:
+                for request in self._listing_pages(theme_name, url, self._page_limit(**known)):
+                    self.crawler.stats.inc_value("listing/speculative_requests")
+                    yield request
 
     def parse(self, response, theme, page):
+        counts = self.page_counts.setdefault(theme, {})
+        if page > counts.get("last_page", page):
+            # requested speculatively, beyond the real page count
+            return
+
         links = response.css('a[aria-label^="Consulter l\'ouvrage"]::attr(href)').getall()
         if not links:
-            self.logger.warning("No book links found on %s", response.url)
+            if page > 1:
+                # early stop: the theme has fewer pages than last time
+                self.crawler.stats.inc_value("listing/empty_pages")
+                counts["last_page"] = min(counts.get("last_page", page), page - 1)
+                self.logger.info("Empty listing page %d for %s", page, theme)
+            else:
+                self.logger.warning("No book links found on %s", response.url)
             return
 
-        items_per_page = len(links)
+        if page == 1:
+            counts["per_page"] = len(links)
 
         # only keep links within the per-theme quota
         if self.max_per_theme >= 0:
@@ -59,78 +91,129 @@ class OuvragesSpider(scrapy.Spider):
                 response.urljoin(href),
                 callback=self.parse_ouvrage,
                 cb_kwargs={"theme": theme},
+                # conditional GET, see ConditionalRequestsMiddleware
+                meta={"revalidate": True, "handle_httpstatus_list": [304]},
             )
 
-        if page != 1:
-            return
+        # Any listing page carries the pagination: the first one to arrive
+        # corrects the guess (a failed page 1 no longer sinks the theme)
+        last_page = self._extract_last_page(response)
+        if last_page and (page == 1 or last_page > counts.get("last_page", 0)):
+            counts["last_page"] = last_page
+            per_page = counts.get("per_page") or self.known_page_counts.get(theme, {}).get("per_page")
+            end = self._page_limit(last_page, per_page)
+            yield from self._listing_pages(theme, response.url, end)
 
-        last_page = self._extract_last_page(response) or 1
+    def _page_limit(self, last_page, per_page=None):
         end = last_page
         if self.max_pages >= 0:
             end = min(end, self.max_pages)
-        if self.max_per_theme >= 0 and items_per_page > 0:
-            end = min(end, -(-self.max_per_theme // items_per_page))
+        if self.max_per_theme >= 0 and per_page:
+            end = min(end, -(-self.max_per_theme // per_page))
+        return end
 
-        for p in range(2, end + 1):
+    def _listing_pages(self, theme, url, end):
+        """Requests for the listing pages of `theme` up to `end` not yet scheduled."""
+        for p in range(self.scheduled_pages[theme] + 1, end + 1):
             yield scrapy.Request(
-                self._build_page_url(response.url, p),
+                self._build_page_url(url, p),
                 callback=self.parse,
                 cb_kwargs={"theme": theme, "page": p},
+                # dropped unsent once the theme turns out shorter, see ListingPagesMiddleware
+                meta={"listing": True},
+            )
+        self.scheduled_pages[theme] = max(self.scheduled_pages[theme], end)
+
+    def _load_page_counts(self, mongo_uri):
+        """Per-theme page counts of the last crawl run (see MongoPipeline)."""
+        try:
+            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=2000)
+            db = client[urlparse(mongo_uri).path.lstrip("/") or "cairn"]
+            last_run = db["crawl_runs"].find_one(
+                {"themes": {"$exists": True}}, sort=[("started_at", -1)]
             )
+            client.close()
+        except PyMongoError as e:
+            self.logger.warning("No previous page counts (%s), listing pages found one by one", e)
+            return {}
+        if not last_run:
+            return {}
+        return {
+            theme: {"last_page": counts["last_page"], "per_page": counts.get("per_page")}
+            for theme, counts in last_run["themes"].items()
+            if counts.get("last_page")
+        }
 
     def parse_ouvrage(self, response, theme):
         # skip if we already hit the limit for this theme
         if self.max_per_theme >= 0 and self.theme_counts.get(theme, 0) >= self.max_per_theme:
             return
 
-        item = OuvrageItem()
+        doc_id = urlparse(response.url).path.strip("/")
+        if response.meta.get("not_modified"):
+            self.theme_counts[theme] += 1
+            self.unchanged[doc_id] = theme
+            return
 
-        item["isbn"] = response.css('meta[name="citation_isbn"]::attr(content)').get("")
-        item["image_url"] = response.css('meta[property="og:image"]::attr(content)').get("")
+        started = time.perf_counter()
+        isbn = response.css('meta[name="citation_isbn"]::attr(content)').get("")
+        image_url = response.css('meta[property="og:image"]::attr(content)').get("")
 
-        item["title"] = self._clean(response.css("h1::text").get(""))
-        item["subtitle"] = self._clean(response.css("h1 + h2::text").get(""))
+        title = self._clean(response.css("h1::text").get(""))
+        subtitle = self._clean(response.css("h1 + h2::text").get(""))
 
-        item["authors"] = response.css(
+        authors = response.css(
             'meta[name="citation_author"]::attr(content)'
         ).getall()
 
-        item["editeur"] = self._clean(
+        editeur = self._clean(
             response.css('meta[name="citation_publisher"]::attr(content)').get("")
         )
 
         collection_el = response.xpath(
             '//span[contains(@class,"font-serif") and contains(text(),"Collection")]/following-sibling::span/text()'
         )
-        item["collection"] = self._clean(collection_el.get(""))
+        collection = self._clean(collection_el.get(""))
 
         pages_match = re.search(r"(\d+)\s*pages", response.text)
-        item["pages"] = int(pages_match.group(1)) if pages_match else None
+        pages = int(pages_match.group(1)) if pages_match else None
 
         price_text = response.css(
             "p.text-cairn-main.text-center::text"
         ).re_first(r"([\d,]+)\s*€")
-        item["price"] = float(price_text.replace(",", ".")) if price_text else None
+        price = float(price_text.replace(",", ".")) if price_text else None
 
         body_text = response.text
         date_par = re.search(r"Date de parution\s*:\s*([\d/]+)", body_text)
-        item["date_parution"] = date_par.group(1) if date_par else None
-
         date_mel = re.search(r"Date de mise en ligne\s*:\s*([\d/]+)", body_text)
-        item["date_mise_en_ligne"] = date_mel.group(1) if date_mel else None
 
         desc_div = response.xpath(
             '//h2[contains(text(),"Présentation")]/following-sibling::div[1]'
         )
-        item["description"] = self._clean(
+        description = self._clean(
             " ".join(desc_div.css("::text").getall())
         )
 
-        item["theme"] = theme
-        item["url"] = response.url
-
-        item["doc_id"] = urlparse(response.url).path.strip("/")
+        item = OuvrageItem(
+            title=title,
+            subtitle=subtitle,
+            authors=authors,
+            collection=collection,
+            editeur=editeur,
+            date_parution=date_par.group(1) if date_par else None,
+            date_mise_en_ligne=date_mel.group(1) if date_mel else None,
+            pages=pages,
+            price=price,
+            description=description,
+            isbn=isbn,
+            theme=theme,
+            image_url=image_url,
+            url=response.url,
+            doc_id=doc_id,
+        )
 
+        # Saved with the page validators, reported when it is revalidated
+        response.meta["parse_ms"] = (time.perf_counter() - started) * 1000
         self.theme_counts[theme] += 1
         yield item
 
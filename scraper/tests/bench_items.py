@@ -0,0 +1,96 @@
+"""Micro-benchmark of the per-item pipeline path.
+
+Compares the former path (dict-backed scrapy.Item, one ItemAdapter.asdict()
+copy per pipeline, then JSON and BSON encoding by each client) with the
+slotted OuvrageItem that both pipelines consume pre-encoded.
+
+Usage (from scraper/):
+    uv run python tests/bench_items.py --items 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import scrapy
+from bson import encode
+from itemadapter import ItemAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cairn_scraper.items import FIELDS, OuvrageItem
+
+SAMPLE = {
+    "title": "La sociologie du travail en France",
+    "subtitle": "Une introduction",
+    "authors": ["Marie Dubois", "Jean Martin"],
+    "collection": "Repères",
+    "editeur": "La Découverte",
+    "date_parution": "12/03/2021",
+    "date_mise_en_ligne": "01/04/2021",
+    "pages": 128,
+    "price": 11.0,
+    "description": "Cet ouvrage propose une synthèse des travaux récents. " * 12,
+    "isbn": "9782348090158",
+    "theme": "Sciences humaines et sociales",
+    "image_url": "https://shs.cairn.info/cover.jpg",
+    "url": "https://shs.cairn.info/la-sociologie-du-travail--9782348090158",
+    "doc_id": "la-sociologie-du-travail--9782348090158",
+}
+
+
+# The former dict-backed item definition
+LegacyItem = type("LegacyItem", (scrapy.Item,), {name: scrapy.Field() for name in FIELDS})
+
+
+def legacy_path(values):
+    item = LegacyItem()
+    for name, value in values.items():
+        item[name] = value
+    # MongoPipeline then ElasticsearchPipeline, each with its own copy
+    encode(ItemAdapter(item).asdict())
+    json.dumps(ItemAdapter(item).asdict()).encode()
+
+
+def slotted_path(values):
+    item = OuvrageItem(**values)
+    item.to_bson()
+    item.to_json()
+
+
+def measure(path, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        path(SAMPLE)
+    elapsed = time.perf_counter() - start
+
+    # Transient memory needed to push one item through both pipelines
+    tracemalloc.start()
+    path(SAMPLE)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / count * 1e6, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, path in [("scrapy.Item + asdict", legacy_path), ("slotted, encoded once", slotted_path)]:
+        path(SAMPLE)  # warm-up
+        results[name] = measure(path, args.items)
+
+    print(f"{'path':<24}{'µs/item':>10}{'peak KiB/item':>16}")
+    for name, (per_item, peak) in results.items():
+        print(f"{name:<24}{per_item:>10.1f}{peak / 1024:>16.1f}")
+    (before, _), (after, _) = results.values()
+    print(f"\nSpeed-up: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
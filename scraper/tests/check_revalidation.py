@@ -0,0 +1,125 @@
+"""Check conditional revalidation against a local server.
+
+Serves a fake listing and BOOKS fake detail pages (with ETag and
+Last-Modified, answering 304 to matching conditional GETs), crawls them
+twice with OuvragesSpider, and prints the revalidation stats of each run.
+The second run must revalidate every page without downloading or parsing
+it. Validators go to a throwaway MongoDB database, dropped at the end.
+
+Usage (from scraper/, with MongoDB running):
+    uv run python tests/check_revalidation.py
+"""
+
+import os
+import sys
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pymongo import MongoClient
+from scrapy.crawler import CrawlerRunner
+from scrapy.settings import Settings
+from scrapy.utils.reactor import install_reactor
+
+install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+from twisted.internet import defer, reactor  # noqa: E402
+
+from cairn_scraper.spiders.ouvrages import OuvragesSpider  # noqa: E402
+
+BOOKS = 20
+MONGO_HOST = os.getenv("MONGO_HOST", "mongodb://localhost:27017")
+TEST_DB = "cairn_revalidation_test"
+LAST_MODIFIED = formatdate(0, usegmt=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/listing"):
+            links = "".join(
+                f'<a aria-label="Consulter l\'ouvrage {i}" href="/livre-{i}">{i}</a>' for i in range(BOOKS)
+            )
+            return self._send(200, f"<html><body>{links}</body></html>")
+
+        etag = f'"{self.path}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, "", etag)
+        body = (
+            f"<html><body><h1>Livre {self.path}</h1>"
+            f"<h2>Présentation</h2><div>{'Une description. ' * 200}</div>"
+            "<p>Date de parution : 01/01/2020</p></body></html>"
+        )
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        data = body.encode()
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        if status != 304:
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    class LocalSpider(OuvragesSpider):
+        name = "ouvrages_local"
+        THEME_URLS = [("Test", f"{base_url}/listing")]
+
+    settings = Settings()
+    settings.setmodule("cairn_scraper.settings")
+    settings.update({
+        "MONGO_URI": f"{MONGO_HOST}/{TEST_DB}",
+        "ITEM_PIPELINES": {},
+        "DOWNLOAD_DELAY": 0,
+        "SCRAPE_MAX_PAGES": -1,
+        "SCRAPE_MAX_ITEMS_PER_THEME": -1,
+        "CONDITIONAL_REQUESTS": True,
+        "LOG_LEVEL": "WARNING",
+    })
+    runner = CrawlerRunner(settings)
+    runs = []
+
+    @defer.inlineCallbacks
+    def crawl_twice():
+        try:
+            for _ in range(2):
+                crawler = runner.create_crawler(LocalSpider)
+                yield runner.crawl(crawler)
+                runs.append(crawler.stats.get_stats())
+        finally:
+            reactor.stop()
+
+    reactor.callWhenRunning(crawl_twice)
+    reactor.run()
+    server.shutdown()
+    MongoClient(MONGO_HOST).drop_database(TEST_DB)
+
+    keys = [
+        "downloader/response_bytes", "revalidation/full_downloads", "revalidation/not_modified",
+        "revalidation/unchanged_body", "revalidation/bytes_saved", "revalidation/parse_ms_saved",
+    ]
+    for number, stats in enumerate(runs, 1):
+        print(f"Run {number}:")
+        for key in keys:
+            print(f"  {key:<30}{stats.get(key, 0):>10}")
+    ok = len(runs) == 2 and runs[1].get("revalidation/not_modified") == BOOKS
+    print("\nOK: every page revalidated with a 304" if ok else "\nFAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
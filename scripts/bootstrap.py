@@ -1,23 +1,63 @@
-"""Entrypoint for the scraper container: wait → init index → crawl."""
+"""Entrypoint for the scraper container: wait → init index ‖ crawl → post-crawl jobs.
 
+The crawler is started as soon as both services are ready and the index is
+initialized while it boots (imports, reactor, validators/aliases loading):
+when opened, before any request, the ES pipeline waits until the index
+exists (ES_WAIT_FOR_INDEX), so the mapping is never created dynamically.
+"""
+
+import os
 import subprocess
 import sys
+import time
+
+from wait_for_services import wait_all
+from init_es_index import index_exists, main as init_index, reset_validators
+from build_stats_snapshot import main as build_stats_snapshot
+from build_similar_books import main as build_similar_books
+from publish_crawl_runs import main as publish_crawl_runs
 
-from wait_for_services import wait_mongo, wait_es
-from init_es_index import main as init_index
+INDEX_WAIT_TIMEOUT = "60"
 
 
 if __name__ == "__main__":
+    started = time.time()
     print("==> Waiting for services...")
-    wait_mongo()
-    wait_es()
+    wait_all()
+    print(f"==> Services ready in {time.time() - started:.1f}s")
 
-    print("==> Initializing ES index...")
-    init_index()
+    if not index_exists():
+        # Before the crawler loads them: a new index needs every page parsed
+        reset_validators()
 
-    print("==> Starting scraper...")
-    result = subprocess.run(
+    print("==> Starting scraper and initializing ES index...")
+    env = {
+        **os.environ,
+        # The crawler logs its time to first request from this instant
+        "BOOTSTRAP_STARTED_AT": str(started),
+        "ES_WAIT_FOR_INDEX": os.getenv("ES_WAIT_FOR_INDEX", INDEX_WAIT_TIMEOUT),
+    }
+    crawl = subprocess.Popen(
         [sys.executable, "-m", "scrapy", "crawl", "ouvrages"],
         cwd="scraper",
+        env=env,
     )
-    sys.exit(result.returncode)
+    try:
+        init_index()
+    except Exception:
+        crawl.terminate()
+        crawl.wait()
+        raise
+    print(f"==> ES index ready after {time.time() - started:.1f}s")
+
+    returncode = crawl.wait()
+    if returncode == 0:
+        print("==> Building stats snapshot...")
+        build_stats_snapshot()
+
+        print("==> Computing similar books...")
+        build_similar_books()
+
+        print("==> Publishing crawl history...")
+        publish_crawl_runs()
+    sys.exit(returncode)
@@ -0,0 +1,183 @@
+"""Precompute the "similar books" list of every ouvrage.
+
+Batch job run after a crawl. Each book is compared to the others with a
+TF-IDF cosine over its French-analyzed title, subtitle and description
+(term vectors come from ES, so the index analyzer is reused as is), plus a
+bonus for shared authors or collection. The top-K neighbours are stored in
+a side index keyed by doc_id, so the webapp reads them with a single get.
+"""
+
+import math
+import os
+from collections import defaultdict
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk, scan
+
+ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
+ES_INDEX = os.getenv("ES_INDEX", "cairn_ouvrages")
+ES_SIMILAR_INDEX = os.getenv("ES_SIMILAR_INDEX", f"{ES_INDEX}_similar")
+ES_ROUTING = os.getenv("ES_ROUTING", "doc_id")
+
+TOP_K = 5
+BATCH_SIZE = 200
+
+# Same boosts as the full-text search in the webapp.
+FIELD_WEIGHTS = {"title": 3.0, "subtitle": 2.0, "description": 1.0}
+AUTHOR_BONUS = 0.3
+COLLECTION_BONUS = 0.1
+# Candidate generation walks the postings of every term of a book, so its
+# cost is (terms per book) x (books per term). Both are capped: a term found
+# in more than MAX_DF_RATIO of the books, or in more than MAX_DF books, is
+# dropped, and each book keeps only its TOP_TERMS heaviest terms. A book then
+# reaches at most TOP_TERMS * MAX_DF candidates, and the job stays linear in
+# the number of books.
+MAX_DF_RATIO = 0.02
+MAX_DF = 500
+TOP_TERMS = 30
+
+SIMILAR_MAPPING = {
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "doc_id":  {"type": "keyword"},
+            "similar": {"type": "object", "enabled": False},
+        },
+    }
+}
+
+
+def load_books(es):
+    """Return {doc_id: metadata} for every book in the index."""
+    books = {}
+    for hit in scan(
+        es,
+        index=ES_INDEX,
+        query={"query": {"match_all": {}}},
+        _source=["title", "authors", "collection", "url", "theme"],
+    ):
+        books[hit["_id"]] = hit["_source"]
+    return books
+
+
+def load_term_frequencies(es, books):
+    """Return {doc_id: {term: weighted tf}} from ES term vectors."""
+    doc_ids = list(books)
+    vectors = {}
+    for start in range(0, len(doc_ids), BATCH_SIZE):
+        batch = doc_ids[start:start + BATCH_SIZE]
+        if ES_ROUTING == "theme":
+            # Custom routing: the id alone no longer tells which shard to ask.
+            docs = {"docs": [{"_id": doc_id, "routing": books[doc_id].get("theme")} for doc_id in batch]}
+        else:
+            docs = {"ids": batch}
+        response = es.mtermvectors(
+            index=ES_INDEX,
+            **docs,
+            fields=list(FIELD_WEIGHTS),
+            positions=False,
+            offsets=False,
+            payloads=False,
+            term_statistics=False,
+            field_statistics=False,
+        )
+        for doc in response["docs"]:
+            terms = defaultdict(float)
+            for field, data in doc.get("term_vectors", {}).items():
+                for term, stats in data["terms"].items():
+                    terms[term] += FIELD_WEIGHTS[field] * (1 + math.log(stats["term_freq"]))
+            vectors[doc["_id"]] = terms
+    return vectors
+
+
+def tfidf(vectors):
+    """Turn term frequencies into L2-normalized TF-IDF vectors (in place).
+
+    Only the TOP_TERMS heaviest terms of each book are kept.
+    """
+    df = defaultdict(int)
+    for terms in vectors.values():
+        for term in terms:
+            df[term] += 1
+
+    n = len(vectors)
+    max_df = max(2, min(MAX_DF, int(n * MAX_DF_RATIO)))
+    for doc_id, terms in vectors.items():
+        weighted = sorted(
+            (
+                (tf * math.log(n / df[term]), term)
+                for term, tf in terms.items()
+                if 1 < df[term] <= max_df
+            ),
+            reverse=True,
+        )
+        weighted = {term: w for w, term in weighted[:TOP_TERMS]}
+        norm = math.sqrt(sum(w * w for w in weighted.values())) or 1.0
+        vectors[doc_id] = {term: w / norm for term, w in weighted.items()}
+    return vectors
+
+
+def neighbours(books, vectors):
+    """Yield (doc_id, [(score, other_id), ...]) with the TOP_K best matches."""
+    postings = defaultdict(list)
+    for doc_id, terms in vectors.items():
+        for term, w in terms.items():
+            postings[term].append((doc_id, w))
+
+    by_author = defaultdict(set)
+    for doc_id, book in books.items():
+        for author in book.get("authors") or []:
+            by_author[author].add(doc_id)
+
+    for doc_id, book in books.items():
+        scores = defaultdict(float)
+        for term, w in vectors.get(doc_id, {}).items():
+            for other_id, other_w in postings[term]:
+                scores[other_id] += w * other_w
+        for author in book.get("authors") or []:
+            for other_id in by_author[author]:
+                scores[other_id] += AUTHOR_BONUS
+        for other_id in scores:
+            if book.get("collection") and books[other_id].get("collection") == book["collection"]:
+                scores[other_id] += COLLECTION_BONUS
+        scores.pop(doc_id, None)
+
+        best = sorted(((s, o) for o, s in scores.items()), reverse=True)[:TOP_K]
+        yield doc_id, best
+
+
+def main():
+    es = Elasticsearch(ES_HOST, request_timeout=60)
+    if not es.indices.exists(index=ES_SIMILAR_INDEX):
+        es.indices.create(index=ES_SIMILAR_INDEX, body=SIMILAR_MAPPING)
+
+    books = load_books(es)
+    vectors = tfidf(load_term_frequencies(es, books))
+
+    actions = (
+        {
+            "_index": ES_SIMILAR_INDEX,
+            "_id": doc_id,
+            "_source": {
+                "doc_id": doc_id,
+                "similar": [
+                    {
+                        "doc_id": other_id,
+                        "title": books[other_id].get("title", ""),
+                        "authors": books[other_id].get("authors") or [],
+                        "url": books[other_id].get("url", ""),
+                        "score": round(score, 4),
+                    }
+                    for score, other_id in best
+                ],
+            },
+        }
+        for doc_id, best in neighbours(books, vectors)
+    )
+    indexed, _ = bulk(es, actions, chunk_size=500)
+    print(f"Similar books written to '{ES_SIMILAR_INDEX}' ({indexed} ouvrages).")
+    es.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Materialize the dashboard aggregations into a single snapshot document.
+
+Runs after a crawl: the statistics page then reads one small document
+instead of recomputing every aggregation over the whole index.
+"""
+
+import os
+from datetime import datetime, timezone
+
+from elasticsearch import Elasticsearch
+
+ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
+ES_INDEX = os.getenv("ES_INDEX", "cairn_ouvrages")
+ES_STATS_INDEX = os.getenv("ES_STATS_INDEX", f"{ES_INDEX}_stats")
+SNAPSHOT_ID = "latest"
+
+# Same aggregations as AGGREGATIONS in webapp/utils/es_client.py (the
+# scraper and webapp images share no code); keep both in sync, as checked
+# by webapp/tests/check_aggregations.py.
+AGGS = {
+    "themes":          {"terms": {"field": "theme", "size": 10}},
+    "editeurs":        {"terms": {"field": "editeur", "size": 20}},
+    "collections":     {"terms": {"field": "collection", "size": 30}},
+    "auteurs":         {"terms": {"field": "authors", "size": 50}},
+    "prix_histogram":  {"histogram": {"field": "price", "interval": 10, "min_doc_count": 1}},
+    "pages_histogram": {"histogram": {"field": "pages", "interval": 100, "min_doc_count": 1}},
+    "annees": {
+        "date_histogram": {
+            "field": "date_parution",
+            "calendar_interval": "year",
+            "format": "yyyy",
+            "min_doc_count": 1,
+        }
+    },
+}
+
+# The snapshot is only ever fetched by id: nothing inside needs indexing.
+STATS_MAPPING = {
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "created_at":   {"type": "date"},
+            "total":        {"type": "long"},
+            "aggregations": {"type": "object", "enabled": False},
+        },
+    }
+}
+
+
+def build_snapshot(es):
+    """Run every dashboard aggregation once and return the snapshot document."""
+    es.indices.refresh(index=ES_INDEX)
+    response = es.search(index=ES_INDEX, body={"size": 0, "track_total_hits": True, "aggs": AGGS})
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "total": response["hits"]["total"]["value"],
+        "aggregations": {
+            name: response["aggregations"][name]["buckets"] for name in AGGS
+        },
+    }
+
+
+def main():
+    es = Elasticsearch(ES_HOST)
+    if not es.indices.exists(index=ES_STATS_INDEX):
+        es.indices.create(index=ES_STATS_INDEX, body=STATS_MAPPING)
+    snapshot = build_snapshot(es)
+    es.index(index=ES_STATS_INDEX, id=SNAPSHOT_ID, document=snapshot, refresh=True)
+    print(f"Stats snapshot written to '{ES_STATS_INDEX}' ({snapshot['total']} ouvrages).")
+    es.close()
+
+
+if __name__ == "__main__":
+    main()
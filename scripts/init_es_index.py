@@ -1,33 +1,90 @@
 """Create the Elasticsearch index with an explicit mapping."""
 
 import os
+from urllib.parse import urlparse
 
 from elasticsearch import Elasticsearch
+from pymongo import MongoClient
+
+from wait_for_services import MONGO_URI
 
 ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
 ES_INDEX = os.getenv("ES_INDEX", "cairn_ouvrages")
+ES_SHARDS = int(os.getenv("ES_SHARDS", 1))
+# "doc_id" (default) spreads books over shards by id; "theme" routes each
+# book by its theme, so theme-filtered queries only hit one shard.
+ES_ROUTING = os.getenv("ES_ROUTING", "doc_id")
+
+# Completion sub-field backing the typeahead (see ESClient.suggest).
+SUGGEST = {"suggest": {"type": "completion", "analyzer": "suggest_folding"}}
 
 MAPPING = {
+    "settings": {
+        "number_of_shards": ES_SHARDS,
+        "analysis": {
+            "analyzer": {
+                "suggest_folding": {
+                    "type": "custom",
+                    "tokenizer": "standard",
+                    "filter": ["lowercase", "asciifolding"],
+                },
+            },
+            # ISBN without separators, compared with the normalized user input (ESClient)
+            "char_filter": {
+                "isbn_separators": {"type": "pattern_replace", "pattern": "[^0-9Xx]", "replacement": ""},
+            },
+            "normalizer": {
+                "isbn": {"type": "custom", "char_filter": ["isbn_separators"], "filter": ["uppercase"]},
+            },
+        },
+    },
     "mappings": {
         "properties": {
-            "title":              {"type": "text", "analyzer": "french"},
+            "title":              {"type": "text", "analyzer": "french", "fields": SUGGEST},
             "subtitle":           {"type": "text", "analyzer": "french"},
-            "authors":            {"type": "keyword"},
+            "authors":            {"type": "keyword", "fields": SUGGEST},
             "collection":         {"type": "keyword"},
-            "editeur":            {"type": "keyword"},
+            "editeur":            {"type": "keyword", "fields": SUGGEST},
             "date_parution":      {"type": "date", "format": "dd/MM/yyyy||yyyy-MM-dd||yyyy"},
             "date_mise_en_ligne": {"type": "date", "format": "dd/MM/yyyy||yyyy-MM-dd||yyyy"},
             "pages":              {"type": "integer"},
             "price":              {"type": "float"},
             "description":        {"type": "text", "analyzer": "french"},
-            "isbn":               {"type": "keyword"},
+            "isbn":               {"type": "keyword", "fields": {"normalized": {"type": "keyword", "normalizer": "isbn"}}},
             "theme":              {"type": "keyword"},
             "image_url":          {"type": "keyword", "index": False},
             "url":                {"type": "keyword", "index": False},
             "doc_id":             {"type": "keyword"},
+            # Scraped values before normalization: stored, not indexed
+            "authors_raw":        {"type": "keyword", "index": False, "doc_values": False},
+            "editeur_raw":        {"type": "keyword", "index": False, "doc_values": False},
+            "collection_raw":     {"type": "keyword", "index": False, "doc_values": False},
         }
     }
 }
+if ES_ROUTING == "theme":
+    # Every write, get and mget must then carry routing=<theme>.
+    MAPPING["mappings"]["_routing"] = {"required": True}
+
+
+def index_exists():
+    es = Elasticsearch(ES_HOST)
+    exists = bool(es.indices.exists(index=ES_INDEX))
+    es.close()
+    return exists
+
+
+def reset_validators():
+    """Forget the page validators of the scraper (ConditionalRequestsMiddleware).
+
+    A new index starts empty: without this, every book page would be
+    revalidated as unchanged and the index would never be filled again.
+    """
+    client = MongoClient(MONGO_URI)
+    validators = client[urlparse(MONGO_URI).path.lstrip("/") or "cairn"]["validators"]
+    deleted = validators.delete_many({}).deleted_count
+    client.close()
+    print(f"Reset {deleted} page validators: the next crawl downloads every book page.")
 
 
 def main():
@@ -35,8 +92,9 @@ def main():
     if es.indices.exists(index=ES_INDEX):
         print(f"Index '{ES_INDEX}' already exists — skipping creation.")
     else:
+        reset_validators()
         es.indices.create(index=ES_INDEX, body=MAPPING)
-        print(f"Index '{ES_INDEX}' created.")
+        print(f"Index '{ES_INDEX}' created ({ES_SHARDS} shard(s), routing by {ES_ROUTING}).")
     es.close()
 
 
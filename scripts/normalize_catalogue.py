@@ -0,0 +1,93 @@
+"""Normalize the authors, publishers and collections of the stored books.
+
+One-shot backfill for books stored before NormalizationPipeline existed, or
+after its rules changed: unchanged pages are not parsed again by the
+scraper (conditional revalidation), so they would keep their old spellings
+next to the canonical ones. The scraped values (the *_raw fields, or the
+stored values when missing) go through the same persisted alias table as the
+scraper; MongoDB documents are updated in place and ES gets partial updates.
+
+Usage:
+    uv run python scripts/normalize_catalogue.py
+"""
+
+import sys
+from pathlib import Path
+from urllib.parse import urlparse
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+from pymongo import MongoClient, UpdateOne
+
+from init_es_index import ES_HOST, ES_INDEX, ES_ROUTING
+from wait_for_services import MONGO_URI
+
+# Alias table and rules shared with the scraper
+scraper_dir = Path(__file__).parent.parent / "scraper"
+if str(scraper_dir) not in sys.path:
+    sys.path.insert(0, str(scraper_dir))
+
+from cairn_scraper.normalization import AliasTable
+
+BATCH_SIZE = 500
+FIELDS = ("authors", "editeur", "collection")
+
+
+def normalized_fields(doc, aliases):
+    """Fields to $set on `doc`, or None when it is already normalized."""
+    raw = {field: doc.get(f"{field}_raw", doc.get(field)) for field in FIELDS}
+    canonical = dict(zip(FIELDS, aliases.normalize(
+        raw["authors"] or [], raw["editeur"] or "", raw["collection"] or "",
+    )))
+    if all(doc.get(field) == canonical[field] and f"{field}_raw" in doc for field in FIELDS):
+        return None
+    return {**canonical, **{f"{field}_raw": raw[field] for field in FIELDS}}
+
+
+def main():
+    client = MongoClient(MONGO_URI)
+    db = client[urlparse(MONGO_URI).path.lstrip("/") or "cairn"]
+    aliases = AliasTable(db["aliases"])
+    es = Elasticsearch(ES_HOST)
+
+    scanned = updated = es_errors = 0
+    mongo_writes, es_actions = [], []
+
+    def flush():
+        nonlocal es_errors
+        if mongo_writes:
+            db["ouvrages"].bulk_write(mongo_writes, ordered=False)
+            # Books missing from the index (e.g. not yet reindexed) are reported, not fatal
+            _, errors = bulk(es, es_actions, raise_on_error=False)
+            es_errors += len(errors)
+        mongo_writes.clear()
+        es_actions.clear()
+
+    projection = {"doc_id": True, "theme": True, **{f: True for f in FIELDS}, **{f"{f}_raw": True for f in FIELDS}}
+    for doc in db["ouvrages"].find({}, projection=projection):
+        scanned += 1
+        fields = normalized_fields(doc, aliases)
+        if fields is None:
+            continue
+        updated += 1
+        mongo_writes.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        action = {"_op_type": "update", "_index": ES_INDEX, "_id": doc["doc_id"], "doc": fields}
+        if ES_ROUTING == "theme":
+            action["routing"] = doc.get("theme")
+        es_actions.append(action)
+        if len(mongo_writes) >= BATCH_SIZE:
+            flush()
+    flush()
+    saved = aliases.save()
+    es.close()
+    client.close()
+
+    print(f"Normalized {updated}/{scanned} books ({saved} new alias entries, {es_errors} ES errors).")
+    for field, (raw, canonical) in aliases.cardinality().items():
+        print(f"  {field}: {raw} raw values -> {canonical} canonical")
+    if updated:
+        print("Re-run build_stats_snapshot.py and build_similar_books.py to refresh the side indexes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Copy the crawl run summaries from MongoDB to a small ES side index.
+
+Runs after a crawl. MongoPipeline writes one pre-aggregated document per
+run (per-theme counts, durations, added/price_changed/removed events) to
+the `crawl_runs` collection; the webapp has no MongoDB access, so the
+statistics page charts the catalogue evolution from this index instead.
+"""
+
+import os
+from urllib.parse import urlparse
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+from pymongo import MongoClient
+
+from wait_for_services import MONGO_URI
+
+ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
+ES_INDEX = os.getenv("ES_INDEX", "cairn_ouvrages")
+ES_RUNS_INDEX = os.getenv("ES_RUNS_INDEX", f"{ES_INDEX}_runs")
+
+# Runs are listed by date; the per-theme breakdown is only read back.
+RUNS_MAPPING = {
+    "mappings": {
+        "dynamic": False,
+        "properties": {
+            "run_id":     {"type": "keyword"},
+            "started_at": {"type": "date"},
+            "themes":     {"type": "object", "enabled": False},
+        },
+    }
+}
+
+
+def main():
+    client = MongoClient(MONGO_URI)
+    runs = client[urlparse(MONGO_URI).path.lstrip("/") or "cairn"]["crawl_runs"]
+
+    es = Elasticsearch(ES_HOST)
+    if not es.indices.exists(index=ES_RUNS_INDEX):
+        es.indices.create(index=ES_RUNS_INDEX, body=RUNS_MAPPING)
+
+    actions = (
+        {"_index": ES_RUNS_INDEX, "_id": run["run_id"], "_source": run}
+        for run in runs.find({}, projection={"_id": False})
+    )
+    count, _ = bulk(es, actions)
+    es.indices.refresh(index=ES_RUNS_INDEX)
+    print(f"{count} crawl run(s) published to '{ES_RUNS_INDEX}'.")
+    es.close()
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Generate a synthetic Cairn catalogue and bulk-load it for scale testing.
+
+Books get Zipf-distributed authors, publishers and collections, French
+titles and descriptions, and realistic dates, prices and page counts.
+Generation is deterministic per chunk (seed + chunk number), so ES and Mongo
+receive the same catalogue while being loaded in parallel.
+
+Usage:
+    uv run python scripts/seed_synthetic.py --scale 100k --target es,mongo --recreate
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk
+from pymongo import MongoClient, ReplaceOne
+
+from init_es_index import ES_HOST, ES_INDEX, ES_ROUTING, MAPPING
+from wait_for_services import MONGO_URI
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+ZIPF_EXPONENT = 1.1
+
+THEMES = ["Sciences humaines et sociales", "Sciences et techniques", "Droit"]
+FIRST_NAMES = [
+    "Marie", "Jean", "Pierre", "Sophie", "Claire", "Nicolas", "Julien", "Camille",
+    "Anne", "Philippe", "Isabelle", "François", "Luc", "Catherine", "Thomas",
+    "Hélène", "Antoine", "Élise", "Michel", "Nathalie", "Olivier", "Sylvie",
+    "Bernard", "Céline", "Laurent", "Agnès", "Étienne", "Valérie", "Rémi", "Zoé",
+]
+LAST_NAMES = [
+    "Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand",
+    "Leroy", "Moreau", "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "David",
+    "Bertrand", "Roux", "Vincent", "Fournier", "Morel", "Girard", "André", "Mercier",
+    "Dupont", "Lambert", "Bonnet", "François", "Martinez", "Legrand", "Garnier",
+    "Faure", "Rousseau", "Blanc", "Guérin", "Muller", "Henry", "Roussel", "Perrin",
+]
+PUBLISHER_WORDS = [
+    "Presses", "Éditions", "Université", "Sciences", "Découverte", "Seuil", "Droit",
+    "Société", "Savoirs", "Horizons", "Méridiens", "Belles", "Lettres", "Critique",
+]
+SUBJECTS = [
+    "la sociologie", "l'histoire", "le droit constitutionnel", "l'économie",
+    "la philosophie", "la psychologie", "la géographie", "l'anthropologie",
+    "la science politique", "l'éducation", "le travail", "la santé publique",
+    "l'environnement", "la démocratie", "la ville", "le numérique", "la famille",
+    "les migrations", "l'État", "la justice pénale", "le contrat", "l'entreprise",
+]
+CONTEXTS = [
+    "en France", "au XXe siècle", "en Europe", "à l'ère numérique",
+    "depuis 1945", "dans le monde contemporain", "face à la crise",
+    "entre théorie et pratique", "au prisme du genre", "en perspective comparée",
+]
+TITLE_TEMPLATES = [
+    "Introduction à {subject}", "Penser {subject} {context}", "Histoire de {subject}",
+    "{Subject} {context}", "Les enjeux de {subject}", "Manuel de {subject}",
+    "Repenser {subject}", "{Subject} : concepts et méthodes",
+]
+SENTENCES = [
+    "Cet ouvrage propose une synthèse des travaux récents sur {subject}.",
+    "L'auteur y analyse les transformations de {subject} {context}.",
+    "À partir d'enquêtes de terrain, il montre comment {subject} s'est recomposé.",
+    "Le livre croise les approches historiques et sociologiques.",
+    "Une lecture indispensable pour comprendre {subject} {context}.",
+    "Les chapitres reviennent sur les débats qui traversent {subject}.",
+    "Il s'adresse aux étudiants comme aux chercheurs confirmés.",
+]
+
+
+def zipf_weights(n):
+    """Cumulative Zipf weights for `random.choices(cum_weights=...)`."""
+    total, cumulative = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1 / rank ** ZIPF_EXPONENT
+        cumulative.append(total)
+    return cumulative
+
+
+def person(i):
+    """i-th distinct author name: first + last, then compound, then initial."""
+    first = FIRST_NAMES[i % len(FIRST_NAMES)]
+    i //= len(FIRST_NAMES)
+    name = LAST_NAMES[i % len(LAST_NAMES)]
+    i //= len(LAST_NAMES)
+    if i:
+        name += "-" + LAST_NAMES[(i - 1) % len(LAST_NAMES)]
+        i = (i - 1) // len(LAST_NAMES)
+        if i:
+            first += f" {chr(ord('A') + (i - 1) % 26)}."
+    return f"{first} {name}"
+
+
+def isbn13(rng):
+    digits = [9, 7, 8, 2] + [rng.randrange(10) for _ in range(8)]
+    check = (10 - sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return "".join(map(str, digits + [check]))
+
+
+class Catalogue:
+    """Deterministic synthetic catalogue of `count` books."""
+
+    def __init__(self, count, seed=42):
+        self.count = count
+        self.seed = seed
+        rng = random.Random(seed)
+
+        # Shuffled so that Zipf ranks are not alphabetical.
+        self.authors = [person(i) for i in range(max(50, count // 4))]
+        rng.shuffle(self.authors)
+        self.publishers = list(dict.fromkeys(
+            f"{rng.choice(PUBLISHER_WORDS)} {rng.choice(PUBLISHER_WORDS)} {rng.choice(LAST_NAMES)}"
+            for _ in range(max(20, count // 500))
+        ))
+        self.collections = list(dict.fromkeys(
+            f"{rng.choice(['Repères', 'Que sais-je ?', 'Manuels', 'Essais', 'Thèses', 'Recherches', 'Grands Repères'])} {rng.choice(SUBJECTS)}"
+            for _ in range(max(30, count // 200))
+        ))
+        self.author_weights = zipf_weights(len(self.authors))
+        self.publisher_weights = zipf_weights(len(self.publishers))
+        self.collection_weights = zipf_weights(len(self.collections))
+
+    def chunk(self, number, size):
+        """Return the books of chunk `number` (same output on every call)."""
+        rng = random.Random(f"{self.seed}-{number}")
+        start = number * size
+        return [self._book(rng, i) for i in range(start, min(start + size, self.count))]
+
+    def chunks(self, size):
+        for number in range(-(-self.count // size)):
+            yield self.chunk(number, size)
+
+    def _book(self, rng, i):
+        subject, context = rng.choice(SUBJECTS), rng.choice(CONTEXTS)
+        title = rng.choice(TITLE_TEMPLATES).format(
+            subject=subject, Subject=subject[0].upper() + subject[1:], context=context
+        )
+        description = " ".join(
+            s.format(subject=subject, context=context) for s in rng.sample(SENTENCES, 4)
+        )
+        year = rng.randint(1990, 2025)
+        parution = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{year}"
+        en_ligne = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{min(2025, year + rng.randint(0, 3))}"
+        isbn = isbn13(rng)
+        doc_id = f"synth-{i:07d}"
+        return {
+            "doc_id": doc_id,
+            "title": title,
+            "subtitle": rng.choice(["", "", f"Regards croisés {context}", "Une introduction"]),
+            "authors": list(dict.fromkeys(
+                rng.choices(self.authors, cum_weights=self.author_weights, k=rng.choice([1, 1, 1, 2, 3]))
+            )),
+            "collection": rng.choices(self.collections, cum_weights=self.collection_weights)[0],
+            "editeur": rng.choices(self.publishers, cum_weights=self.publisher_weights)[0],
+            "date_parution": parution,
+            "date_mise_en_ligne": en_ligne,
+            "pages": max(48, int(rng.gauss(260, 90))),
+            "price": round(min(150.0, rng.lognormvariate(3.1, 0.4)), 2),
+            "description": description,
+            "isbn": isbn,
+            "theme": rng.choice(THEMES),
+            "image_url": "",
+            "url": f"https://shs.cairn.info/{doc_id}--{isbn}",
+        }
+
+
+def load_es(catalogue, args):
+    es = Elasticsearch(ES_HOST, request_timeout=120)
+    if args.recreate and es.indices.exists(index=args.index):
+        es.indices.delete(index=args.index)
+    if not es.indices.exists(index=args.index):
+        es.indices.create(index=args.index, body=MAPPING)
+
+    # No refresh and no replica during the load, restored afterwards
+    # (an unset refresh_interval is restored as null, i.e. the default).
+    current = es.indices.get_settings(index=args.index)[args.index]["settings"]["index"]
+    original = {
+        "refresh_interval": current.get("refresh_interval"),
+        "number_of_replicas": current.get("number_of_replicas"),
+    }
+    es.indices.put_settings(index=args.index, settings={"refresh_interval": "-1", "number_of_replicas": 0})
+    actions = (
+        {"_index": args.index, "_id": doc["doc_id"], "_source": doc,
+         **({"_routing": doc["theme"]} if ES_ROUTING == "theme" else {})}
+        for chunk in catalogue.chunks(args.chunk_size) for doc in chunk
+    )
+    failed = 0
+    try:
+        for ok, _ in parallel_bulk(
+            es, actions, thread_count=args.workers, chunk_size=args.chunk_size, raise_on_error=False
+        ):
+            failed += not ok
+    finally:
+        es.indices.put_settings(index=args.index, settings=original)
+    es.indices.refresh(index=args.index)
+    es.close()
+    return failed
+
+
+def load_mongo(catalogue, args):
+    parsed = urlparse(MONGO_URI)
+    client = MongoClient(MONGO_URI)
+    collection = client[parsed.path.lstrip("/") or "cairn"]["ouvrages"]
+    if args.recreate:
+        collection.drop()
+    collection.create_index("doc_id")
+
+    def insert(number):
+        chunk = catalogue.chunk(number, args.chunk_size)
+        if args.recreate:
+            collection.insert_many(chunk, ordered=False)
+        else:
+            # Upserts by doc_id: re-seeding must not duplicate the books
+            collection.bulk_write(
+                [ReplaceOne({"doc_id": doc["doc_id"]}, doc, upsert=True) for doc in chunk],
+                ordered=False,
+            )
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(insert, range(-(-catalogue.count // args.chunk_size))))
+    client.close()
+    return 0
+
+
+def timed(name, load, catalogue, args):
+    start = time.perf_counter()
+    failed = load(catalogue, args)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name}: {catalogue.count - failed} books in {elapsed:.1f} s "
+        f"({(catalogue.count - failed) / elapsed:,.0f} docs/s, {failed} failed)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", default="10k", help="10k, 100k, 1m or an explicit count")
+    parser.add_argument("--target", default="es", help="Comma-separated: es, mongo")
+    parser.add_argument("--index", default=ES_INDEX)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recreate", action="store_true", help="Drop the index/collection first")
+    args = parser.parse_args()
+
+    count = SCALES.get(args.scale.lower()) or int(args.scale)
+    catalogue = Catalogue(count, args.seed)
+    loaders = {"es": ("Elasticsearch", load_es), "mongo": ("MongoDB", load_mongo)}
+    targets = [loaders[t.strip()] for t in args.target.split(",")]
+
+    print(f"Seeding {count:,} synthetic books into {', '.join(name for name, _ in targets)}...")
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        futures = [pool.submit(timed, name, load, catalogue, args) for name, load in targets]
+        for future in futures:
+            future.result()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,93 @@
-"""Wait for MongoDB and Elasticsearch to be ready."""
+"""Wait for MongoDB and Elasticsearch to be ready.
+
+Both services are checked concurrently, each with jittered exponential
+backoff between attempts ("full jitter": a random delay up to an
+exponentially growing cap), and with health-level checks rather than a bare
+ping: Elasticsearch must report a cluster health of at least yellow (the
+primaries of the index are allocated, so writes will succeed) and MongoDB
+must be a writable primary. The cluster health call itself blocks on the
+server until yellow, so Elasticsearch is seen as ready as soon as it is.
+"""
 
 import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
 from elasticsearch import Elasticsearch
 
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/cairn")
 ES_HOST = os.getenv("ES_HOST", "http://localhost:9200")
-MAX_RETRIES = 30
-RETRY_INTERVAL = 2
+WAIT_TIMEOUT = float(os.getenv("WAIT_TIMEOUT", 60))
+BACKOFF_BASE = 0.1
+BACKOFF_CAP = 5.0
 
 
-def wait_mongo():
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-    for i in range(MAX_RETRIES):
-        try:
-            client.admin.command("ping")
-            print("MongoDB is ready.")
-            client.close()
-            return
-        except ConnectionFailure:
-            print(f"Waiting for MongoDB... ({i + 1}/{MAX_RETRIES})")
-            time.sleep(RETRY_INTERVAL)
-    raise RuntimeError("MongoDB did not become ready in time.")
-
-
-def wait_es():
-    es = Elasticsearch(ES_HOST, request_timeout=2)
-    for i in range(MAX_RETRIES):
+def wait_until(name, check, timeout=WAIT_TIMEOUT):
+    """Call `check()` until it returns (True, detail); return the time waited.
+
+    `check` returns (ready, detail) and may raise while the service is down.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    attempt = 0
+    while True:
         try:
-            if es.ping():
-                print("Elasticsearch is ready.")
-                es.close()
-                return
-        except Exception:
-            pass
-        print(f"Waiting for Elasticsearch... ({i + 1}/{MAX_RETRIES})")
-        time.sleep(RETRY_INTERVAL)
-    raise RuntimeError("Elasticsearch did not become ready in time.")
+            ready, detail = check()
+        except Exception as e:
+            ready, detail = False, f"{type(e).__name__}: {e}"
+        waited = time.monotonic() - started
+        if ready:
+            print(f"{name} is ready after {waited:.1f}s ({detail}).")
+            return waited
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        if time.monotonic() + delay > deadline:
+            raise RuntimeError(f"{name} did not become ready in {timeout:g}s: {detail}")
+        attempt += 1
+        print(f"Waiting for {name}... (attempt {attempt}, {detail}, retry in {delay:.2f}s)")
+        time.sleep(delay)
+
+
+def wait_mongo(timeout=WAIT_TIMEOUT):
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=1000, connectTimeoutMS=1000)
+
+    def primary_ready():
+        hello = client.admin.command("hello")
+        if hello.get("isWritablePrimary"):
+            return True, "writable primary"
+        return False, "not a writable primary yet"
+
+    try:
+        return wait_until("MongoDB", primary_ready, timeout)
+    finally:
+        client.close()
+
+
+def wait_es(timeout=WAIT_TIMEOUT):
+    es = Elasticsearch(ES_HOST, request_timeout=10)
+
+    def cluster_healthy():
+        # Long poll: returns as soon as the cluster is yellow, or after 5 s
+        health = es.cluster.health(wait_for_status="yellow", timeout="5s")
+        return not health["timed_out"], f"cluster {health['status']}"
+
+    try:
+        return wait_until("Elasticsearch", cluster_healthy, timeout)
+    finally:
+        es.close()
+
+
+def wait_all(timeout=WAIT_TIMEOUT):
+    """Wait for both services concurrently; raise if either is not ready."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(wait_mongo, timeout), pool.submit(wait_es, timeout)]
+        errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        raise RuntimeError("; ".join(str(error) for error in errors))
 
 
 if __name__ == "__main__":
-    wait_mongo()
-    wait_es()
+    wait_all()
     print("All services are ready.")
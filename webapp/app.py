@@ -50,4 +50,12 @@ with st.sidebar.expander("ℹ️ À propos"):
     - Streamlit (interface)
     """)
 
-pg.run()
+# Profilage par échantillonnage du rerun (PROFILE=1, cf. utils/profiling.py)
+from utils.profiling import profile_rerun
+with profile_rerun(pg.title):
+    pg.run()
+
+# Temps de réponse des requêtes (après le rendu de la page, pour inclure
+# celles qu'elle vient d'envoyer)
+from utils.components import render_diagnostics
+render_diagnostics()
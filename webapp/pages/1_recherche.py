@@ -11,16 +11,39 @@ webapp_dir = Path(__file__).parent.parent
 if str(webapp_dir) not in sys.path:
     sys.path.insert(0, str(webapp_dir))
 
-from utils.es_client import ESClient
-from utils.components import render_ouvrage_card, render_sidebar_filters, render_pagination
+from utils.es_client import DocumentStore, create_client
+from utils.export import FORMATS, INLINE_MAX_BYTES, ExportFile, export_results, sweep_exports
+from utils.components import (
+    get_cover_cache,
+    render_ouvrage_card,
+    render_sidebar_filters,
+    render_pagination,
+)
 
-# Initialisation du client Elasticsearch
+# Initialisation du client de recherche (Elasticsearch ou embarqué)
 @st.cache_resource
 def get_es_client():
-    return ESClient()
+    return create_client()
 
 es_client = get_es_client()
 
+# Suggestions mises en cache : la même saisie ne repart pas vers ES
+@st.cache_data(ttl=300, show_spinner=False)
+def get_suggestions(prefix: str) -> dict:
+    return es_client.suggest(prefix)
+
+
+def apply_suggestion(value: str) -> None:
+    """Remplit la barre de recherche avec la suggestion choisie."""
+    st.session_state.search_input = value
+
+
+def apply_editeur_suggestion(value: str) -> None:
+    """Filtre sur l'éditeur choisi (l'éditeur n'est pas un champ plein texte)."""
+    st.session_state.search_input = ""
+    st.session_state.suggest_editeur = value
+    st.session_state.search_page = 1
+
 # Titre
 st.title("🔍 Recherche d'ouvrages")
 
@@ -31,30 +54,72 @@ if "search_page" not in st.session_state:
 if "search_query" not in st.session_state:
     st.session_state.search_query = ""
 
+# Documents complets de la session, pour ouvrir les fiches sans requête
+if "doc_store" not in st.session_state:
+    st.session_state.doc_store = DocumentStore()
+
+if "search_input" not in st.session_state:
+    st.session_state.search_input = st.session_state.search_query
+
 # Barre de recherche
 query = st.text_input(
     "Rechercher par titre, auteur ou description",
-    value=st.session_state.search_query,
     placeholder="Ex: sociologie, droit constitutionnel, Pierre Durand...",
     key="search_input"
 )
 
+# Autocomplétion sur les titres, auteurs et éditeurs
+suggestions = get_suggestions(query)
+if any(suggestions.values()):
+    col_titres, col_auteurs, col_editeurs = st.columns(3)
+    with col_titres:
+        for i, titre in enumerate(suggestions["titres"]):
+            if titre != query:
+                st.button(f"📘 {titre}", key=f"suggest_titre_{i}",
+                          on_click=apply_suggestion, args=(titre,))
+    with col_auteurs:
+        for i, auteur in enumerate(suggestions["auteurs"]):
+            if auteur != query:
+                st.button(f"✍️ {auteur}", key=f"suggest_auteur_{i}",
+                          on_click=apply_suggestion, args=(auteur,))
+    with col_editeurs:
+        for i, editeur in enumerate(suggestions["editeurs"]):
+            st.button(f"🏢 {editeur}", key=f"suggest_editeur_{i}",
+                      on_click=apply_editeur_suggestion, args=(editeur,))
+
 # Si la query change, réinitialiser la page
 if query != st.session_state.search_query:
     st.session_state.search_query = query
     st.session_state.search_page = 1
 
-# Récupérer les agrégations pour les filtres
-aggs = es_client.get_aggregations()
+# Pages de facettes (collections, auteurs) mises en cache
+@st.cache_data(ttl=300, show_spinner=False)
+def load_facet_page(field: str, filters: dict = None, prefix: str = "", after: dict = None) -> dict:
+    return es_client.get_facet_page(field, filters=filters, prefix=prefix, after=after)
+
+
+# Récupérer les agrégations pour les filtres (collections et auteurs sont
+# parcourus à la demande, voir load_facet_page)
+aggs = es_client.get_aggregations(names=["themes", "editeurs"])
 
 # Afficher les filtres dans la sidebar
 filters = render_sidebar_filters(
     themes=aggs["themes"],
     editeurs=aggs["editeurs"],
-    collections=aggs["collections"],
-    auteurs=aggs["auteurs"],
+    load_facet_page=load_facet_page,
 )
 
+# Éditeur choisi depuis l'autocomplétion
+if st.session_state.get("suggest_editeur"):
+    editeur = st.session_state.suggest_editeur
+    filters.setdefault("editeur", [])
+    if editeur not in filters["editeur"]:
+        filters["editeur"].append(editeur)
+    if st.sidebar.button(f"✖️ Éditeur : {editeur}"):
+        del st.session_state.suggest_editeur
+        st.session_state.search_page = 1
+        st.rerun()
+
 # Affichage du nombre total d'ouvrages
 total_count = es_client.get_count()
 st.sidebar.markdown(f"**Total d'ouvrages :** {total_count}")
@@ -73,6 +138,7 @@ results = es_client.search(
     filters=filters,
     page=page,
     size=size,
+    doc_store=st.session_state.doc_store,
 )
 
 # Affichage des résultats
@@ -86,6 +152,54 @@ else:
     start = (page - 1) * size + 1
     end = min(page * size, total)
     st.markdown(f"**{total} résultat(s) trouvé(s)** — Affichage de {start} à {end}")
+    if results["plan"] == "fuzzy":
+        st.caption("Peu de correspondances exactes : la recherche inclut les orthographes proches.")
+
+    # Export de l'ensemble des résultats (pas seulement la page affichée)
+    with st.expander("📥 Exporter les résultats"):
+        export_format = st.radio("Format", list(FORMATS), horizontal=True, key="export_format")
+        extension, mime, _ = FORMATS[export_format]
+        export_key = (query, repr(sorted(filters.items())), export_format, results["plan"])
+
+        if st.button("Préparer l'export"):
+            # Le fichier est écrit au fil du parcours, sur disque
+            previous = st.session_state.pop("export", None)
+            if previous:
+                previous.delete()
+            sweep_exports()
+            export = ExportFile(extension, export_key)
+            try:
+                with open(export.path, "wb") as f, st.spinner("Export en cours..."):
+                    export.count = export_results(
+                        es_client, f, export_format,
+                        query=query, filters=filters, plan=results["plan"],
+                    )
+                st.session_state.export = export
+            except Exception as e:
+                export.delete()
+                st.error(f"Erreur lors de l'export : {e}")
+
+        export = st.session_state.get("export")
+        if export and export.key == export_key and export.path.exists():
+            label = f"💾 Télécharger ({export.count} ouvrages)"
+            if st.get_option("server.enableStaticServing"):
+                # Servi depuis le disque par le serveur statique, sans copie en mémoire
+                st.markdown(
+                    f'<a href="{export.url}" download="cairn_ouvrages.{extension}">{label}</a>',
+                    unsafe_allow_html=True,
+                )
+            elif export.path.stat().st_size <= INLINE_MAX_BYTES:
+                with open(export.path, "rb") as f:
+                    st.download_button(label, f, file_name=f"cairn_ouvrages.{extension}", mime=mime)
+            else:
+                st.warning(
+                    "Export trop volumineux pour être envoyé par la page : lancez la webapp "
+                    "depuis la racine du dépôt (.streamlit/config.toml active le service "
+                    "statique des fichiers)."
+                )
+
+    # Couvertures manquantes téléchargées en parallèle avant le rendu
+    get_cover_cache().prefetch([hit["_source"].get("image_url") for hit in hits])
 
     # Affichage des cartes d'ouvrages
     for hit in hits:
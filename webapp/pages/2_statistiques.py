@@ -2,192 +2,147 @@
 Page de statistiques et visualisations.
 Affiche des graphiques sur le catalogue d'ouvrages.
 """
+import hashlib
+import json
 import streamlit as st
 import sys
 from pathlib import Path
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 
 # Ajouter le dossier webapp au path pour les imports
 webapp_dir = Path(__file__).parent.parent
 if str(webapp_dir) not in sys.path:
     sys.path.insert(0, str(webapp_dir))
 
-from utils.es_client import ESClient
+from utils.es_client import create_client
+from utils.dashboard import AggregationCache, load_aggregations
+from utils.components import render_dashboard_filters
 
 # Titre
 st.title("📊 Statistiques du catalogue")
 
-# Initialisation du client Elasticsearch
+# Initialisation du client de recherche (Elasticsearch ou embarqué)
 @st.cache_resource
 def get_es_client():
-    return ESClient()
+    return create_client()
 
 es_client = get_es_client()
 
-# Récupération des agrégations
-aggs = es_client.get_aggregations()
-
-# Nombre total d'ouvrages
-total = es_client.get_count()
-st.metric("Nombre total d'ouvrages", total)
-
-st.divider()
-
-# === GRAPHIQUES ===
-
-# 1. Distribution par thème (Pie Chart)
-st.markdown("### 📚 Répartition par thème")
-if aggs["themes"]:
-    themes_df = pd.DataFrame(aggs["themes"])
-    fig_themes = px.pie(
-        themes_df,
-        values="doc_count",
-        names="key",
-        title="Distribution des ouvrages par thème",
-        hole=0.3,  # Donut chart
-    )
-    st.plotly_chart(fig_themes, use_container_width=True)
-else:
-    st.info("Aucune donnée de thème disponible.")
-
-st.divider()
-
-# 2. Top 10 éditeurs (Bar Chart)
-st.markdown("### 🏢 Top 10 des éditeurs")
-if aggs["editeurs"]:
-    editeurs_df = pd.DataFrame(aggs["editeurs"][:10])
-    fig_editeurs = px.bar(
-        editeurs_df,
-        x="doc_count",
-        y="key",
-        orientation="h",
-        title="Nombre d'ouvrages par éditeur",
-        labels={"doc_count": "Nombre d'ouvrages", "key": "Éditeur"},
-        color="doc_count",
-        color_continuous_scale="Blues",
-    )
-    fig_editeurs.update_layout(yaxis={'categoryorder':'total ascending'})
-    st.plotly_chart(fig_editeurs, use_container_width=True)
+# Cache des agrégations filtrées, partagé entre les sessions
+@st.cache_resource
+def get_aggregation_cache():
+    return AggregationCache()
+
+
+# Récupération des agrégations : instantané post-crawl par défaut,
+# agrégation en direct sur demande ou si aucun instantané n'existe
+live = st.sidebar.toggle(
+    "Agrégation en direct",
+    value=False,
+    help="Recalcule les statistiques sur l'index au lieu de lire l'instantané du dernier crawl.",
+)
+snapshot = None if live else es_client.get_stats_snapshot()
+generation = snapshot["created_at"] if snapshot else "live"
+cache = get_aggregation_cache()
+
+if snapshot:
+    base_aggs = snapshot["aggregations"]
 else:
-    st.info("Aucune donnée d'éditeur disponible.")
-
-st.divider()
-
-# 3. Distribution des prix (Histogram)
-st.markdown("### 💰 Distribution des prix")
-if aggs["prix_histogram"]:
-    prix_df = pd.DataFrame(aggs["prix_histogram"])
-    prix_df["key"] = prix_df["key"].astype(float)
-
-    fig_prix = px.bar(
-        prix_df,
-        x="key",
-        y="doc_count",
-        title="Répartition par tranche de prix (10€)",
-        labels={"key": "Prix (€)", "doc_count": "Nombre d'ouvrages"},
-        color="doc_count",
-        color_continuous_scale="Greens",
-    )
-    st.plotly_chart(fig_prix, use_container_width=True)
+    base_aggs = load_aggregations(es_client, {}, cache, generation)
+
+# Filtres du tableau de bord : seules les agrégations qui dépendent d'un
+# filtre modifié sont recalculées, les autres viennent du cache
+filters = render_dashboard_filters(base_aggs)
+
+if filters:
+    aggs = load_aggregations(es_client, filters, cache, generation)
+    total = es_client.get_count(filters)
+elif snapshot:
+    aggs = base_aggs
+    total = snapshot["total"]
 else:
-    st.info("Aucune donnée de prix disponible.")
-
-st.divider()
+    aggs = base_aggs
+    total = es_client.get_count()
 
-# 4. Distribution du nombre de pages
-st.markdown("### 📄 Distribution du nombre de pages")
-if aggs["pages_histogram"]:
-    pages_df = pd.DataFrame(aggs["pages_histogram"])
-    pages_df["key"] = pages_df["key"].astype(int)
-
-    fig_pages = px.bar(
-        pages_df,
-        x="key",
-        y="doc_count",
-        title="Répartition par tranche de pages (100 p.)",
-        labels={"key": "Nombre de pages", "doc_count": "Nombre d'ouvrages"},
-        color="doc_count",
-        color_continuous_scale="Oranges",
-    )
-    st.plotly_chart(fig_pages, use_container_width=True)
-else:
-    st.info("Aucune donnée de pages disponible.")
+# Nombre total d'ouvrages (correspondant aux filtres)
+st.metric("Nombre total d'ouvrages", total)
+if snapshot:
+    st.caption(f"Instantané calculé le {snapshot['created_at'][:16].replace('T', ' à ')} (UTC)")
+elif not live:
+    st.caption("Aucun instantané disponible — statistiques calculées en direct.")
+if filters:
+    st.caption("Chaque graphique applique tous les filtres sauf celui portant sur son propre champ.")
 
 st.divider()
 
-# 4. Évolution temporelle (Line Chart)
-st.markdown("### 📅 Évolution des publications par année")
-if aggs["annees"]:
-    annees_df = pd.DataFrame(aggs["annees"])
-    annees_df["key"] = pd.to_datetime(annees_df["key"], unit="ms")
-    annees_df = annees_df.sort_values("key")
-    
-    fig_annees = px.line(
-        annees_df,
-        x="key",
-        y="doc_count",
-        title="Nombre d'ouvrages publiés par année",
-        labels={"key": "Année", "doc_count": "Nombre d'ouvrages"},
-        markers=True,
-    )
-    fig_annees.update_traces(line_color="#1f77b4", line_width=3)
-    st.plotly_chart(fig_annees, use_container_width=True)
-else:
-    st.info("Aucune donnée temporelle disponible.")
-
-st.divider()
+# === GRAPHIQUES ===
 
-# 5. Top collections
-st.markdown("### 📖 Collections les plus fournies")
-if aggs["collections"]:
-    collections_df = pd.DataFrame(aggs["collections"][:15])
-    
-    fig_collections = go.Figure(go.Bar(
-        x=collections_df["doc_count"],
-        y=collections_df["key"],
-        orientation='h',
-        marker=dict(
-            color=collections_df["doc_count"],
-            colorscale='Viridis',
-        )
-    ))
-    
-    fig_collections.update_layout(
-        title="Top 15 des collections",
-        xaxis_title="Nombre d'ouvrages",
-        yaxis_title="Collection",
-        yaxis={'categoryorder':'total ascending'},
-        height=500,
-    )
-    
-    st.plotly_chart(fig_collections, use_container_width=True)
-else:
-    st.info("Aucune donnée de collection disponible.")
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_chart(builder: str, buckets_hash: str, _buckets: list[dict]) -> dict:
+    """
+    Construit un graphique et le renvoie sérialisé (dict Plotly).
+    Mis en cache sur l'empreinte des buckets : tant que les données ne
+    changent pas, ni pandas ni Plotly ne sont sollicités.
+    """
+    # pandas et Plotly ne sont importés qu'ici, au premier graphique construit
+    from utils import charts
+    return getattr(charts, builder)(_buckets).to_dict()
+
+
+def buckets_hash(buckets: list[dict]) -> str:
+    """Empreinte stable d'une liste de buckets."""
+    return hashlib.sha1(json.dumps(buckets, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# Chaque graphique : (titre de section, agrégation, fonction de utils.charts,
+# message si aucune donnée)
+CHARTS = [
+    ("### 📚 Répartition par thème", "themes", "themes_pie",
+     "Aucune donnée de thème disponible."),
+    ("### 🏢 Top 10 des éditeurs", "editeurs", "editeurs_bar",
+     "Aucune donnée d'éditeur disponible."),
+    ("### 💰 Distribution des prix", "prix_histogram", "prix_histogram",
+     "Aucune donnée de prix disponible."),
+    ("### 📄 Distribution du nombre de pages", "pages_histogram", "pages_histogram",
+     "Aucune donnée de pages disponible."),
+    ("### 📅 Évolution des publications par année", "annees", "annees_line",
+     "Aucune donnée temporelle disponible."),
+    ("### 📖 Collections les plus fournies", "collections", "collections_bar",
+     "Aucune donnée de collection disponible."),
+    ("### ✍️ Auteurs les plus prolifiques", "auteurs", "auteurs_bar",
+     "Aucune donnée d'auteur disponible."),
+]
+
+for i, (heading, agg_name, builder, empty_message) in enumerate(CHARTS):
+    if i:
+        st.divider()
+    st.markdown(heading)
+    buckets = aggs[agg_name]
+    if buckets:
+        fig = build_chart(builder, buckets_hash(buckets), buckets)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info(empty_message)
+
+# === HISTORIQUE DES CRAWLS ===
+# Résumés pré-agrégés par crawl (pas de parcours du catalogue), indépendants
+# des filtres du tableau de bord
 
 st.divider()
-
-# 6. Top auteurs
-st.markdown("### ✍️ Auteurs les plus prolifiques")
-if aggs["auteurs"]:
-    auteurs_df = pd.DataFrame(aggs["auteurs"][:20])
-    
-    fig_auteurs = px.bar(
-        auteurs_df,
-        x="doc_count",
-        y="key",
-        orientation="h",
-        title="Top 20 des auteurs par nombre d'ouvrages",
-        labels={"doc_count": "Nombre d'ouvrages", "key": "Auteur"},
-        color="doc_count",
-        color_continuous_scale="Purples",
-    )
-    fig_auteurs.update_layout(
-        yaxis={'categoryorder': 'total ascending'},
-        height=500,
+st.markdown("### 📈 Évolution du catalogue")
+runs = es_client.get_crawl_runs()
+if runs:
+    runs_hash = buckets_hash(runs)
+    st.plotly_chart(build_chart("catalogue_evolution", runs_hash, runs), use_container_width=True)
+    if len(runs) > 1:
+        st.plotly_chart(build_chart("crawl_changes", runs_hash, runs), use_container_width=True)
+    last = runs[-1]
+    duration_s = last["duration_s"]
+    duration = f"{duration_s:.0f} s" if duration_s < 60 else f"{duration_s / 60:.0f} min"
+    # Crawl limité (SCRAPE_MAX_*) : les ouvrages retirés ne sont pas détectés
+    partial = "" if last.get("complete", True) else ", limité : retraits non détectés"
+    st.caption(
+        f"Dernier crawl : {last['items']} ouvrages en {duration} "
+        f"({last['finish_reason']}{partial})"
     )
-    
-    st.plotly_chart(fig_auteurs, use_container_width=True)
 else:
-    st.info("Aucune donnée d'auteur disponible.")
+    st.info("Aucun historique de crawl disponible.")
@@ -0,0 +1,84 @@
+"""
+Compare la latence du moteur embarqué et d'Elasticsearch sur les mêmes données.
+Elasticsearch doit contenir les fixtures (voir seed_fixtures.py) ; le moteur
+embarqué les charge directement.
+
+Usage : uv run python webapp/tests/bench_backends.py [--repeat 50]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le dossier webapp au path pour les imports
+webapp_dir = Path(__file__).parent.parent
+if str(webapp_dir) not in sys.path:
+    sys.path.insert(0, str(webapp_dir))
+
+from utils.es_client import ESClient
+from utils.memory_client import MemoryClient
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures.json"
+
+# Opérations mesurées : (nom, appel sur un client)
+OPERATIONS = [
+    ("search: match_all", lambda c: c.search()),
+    ("search: texte", lambda c: c.search("sociologie du travail")),
+    ("search: texte flou", lambda c: c.search("entreprenneur")),
+    ("search: texte + filtre", lambda c: c.search("politique", {"editeur": ["La Découverte"]})),
+    ("get_by_id", lambda c: c.get_by_id("test-001")),
+    ("get_aggregations", lambda c: c.get_aggregations()),
+    ("get_count", lambda c: c.get_count()),
+    ("suggest", lambda c: c.suggest("le")),
+]
+
+
+def bench(client, repeat: int) -> dict[str, list[float]]:
+    """Exécute chaque opération `repeat` fois et renvoie les durées (ms)."""
+    timings = {}
+    for name, operation in OPERATIONS:
+        operation(client)  # échauffement (connexion, caches)
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            operation(client)
+            durations.append((time.perf_counter() - start) * 1000)
+        timings[name] = durations
+    return timings
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50, help="Nombre de mesures par opération")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    memory = MemoryClient.from_fixtures(FIXTURES_PATH)
+    print(f"Index embarqué construit en {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(memory.docs)} ouvrages)\n")
+
+    results = {"memory": bench(memory, args.repeat)}
+    es = ESClient()
+    if es.get_count() == 0:
+        print("Elasticsearch vide ou injoignable : seul le moteur embarqué est mesuré.\n")
+    else:
+        results["elasticsearch"] = bench(es, args.repeat)
+
+    header = f"{'opération':<26}" + "".join(f"{name + ' p50':>20}{'p95':>10}" for name in results)
+    print(header)
+    print("-" * len(header))
+    for name, _ in OPERATIONS:
+        line = f"{name:<26}"
+        for timings in results.values():
+            line += f"{statistics.median(timings[name]):>17.2f} ms{percentile(timings[name], 95):>7.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
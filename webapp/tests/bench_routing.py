@@ -0,0 +1,117 @@
+"""
+Mesure le gain du routage par thème sur un index multi-shards.
+Copie l'index courant (reindex) dans deux index de test de même nombre de
+shards, l'un routé par doc_id, l'autre par thème, puis compare les
+latences des requêtes filtrées par thème. Les index de test sont supprimés
+à la fin.
+
+Usage : uv run python webapp/tests/bench_routing.py [--shards 6] [--repeat 50]
+"""
+import argparse
+import copy
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from elasticsearch import Elasticsearch
+
+# Ajouter le dossier webapp au path pour les imports
+webapp_dir = Path(__file__).parent.parent
+if str(webapp_dir) not in sys.path:
+    sys.path.insert(0, str(webapp_dir))
+
+# Mapping canonique, partagé avec le scraper (scripts/init_es_index.py)
+scripts_dir = webapp_dir.parent / "scripts"
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from init_es_index import ES_HOST, ES_INDEX, MAPPING
+from utils.es_client import ESClient
+
+LAYOUTS = ["doc_id", "theme"]
+
+
+def create_copy(es: Elasticsearch, name: str, shards: int, routing: str) -> None:
+    """Crée `name` avec `shards` shards et y recopie ES_INDEX."""
+    mapping = copy.deepcopy(MAPPING)
+    mapping["settings"]["number_of_shards"] = shards
+    mapping["settings"]["number_of_replicas"] = 0
+    mapping["mappings"].pop("_routing", None)
+    if routing == "theme":
+        mapping["mappings"]["_routing"] = {"required": True}
+
+    if es.indices.exists(index=name):
+        es.indices.delete(index=name)
+    es.indices.create(index=name, body=mapping)
+    body = {"source": {"index": ES_INDEX}, "dest": {"index": name}}
+    if routing == "theme":
+        body["script"] = {"source": "ctx._routing = ctx._source.theme"}
+    es.reindex(body=body, wait_for_completion=True, request_timeout=600)
+    es.indices.refresh(index=name)
+    es.indices.forcemerge(index=name, max_num_segments=1, request_timeout=600)
+
+
+def bench(client: ESClient, themes: list[str], repeat: int) -> dict[str, list[float]]:
+    """Durées (ms) des opérations filtrées par thème."""
+    operations = {
+        "search": lambda theme: client.search("histoire", {"theme": [theme]}),
+        "get_aggregations": lambda theme: client.get_aggregations({"theme": [theme]}),
+        "get_count": lambda theme: client.get_count({"theme": [theme]}),
+    }
+    timings = {}
+    for name, operation in operations.items():
+        for theme in themes:
+            operation(theme)  # échauffement
+        durations = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            operation(themes[i % len(themes)])
+            durations.append((time.perf_counter() - start) * 1000)
+        timings[name] = durations
+    return timings
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, default=6, help="Nombre de shards des index de test")
+    parser.add_argument("--repeat", type=int, default=50, help="Nombre de mesures par opération")
+    args = parser.parse_args()
+
+    es = Elasticsearch(ES_HOST)
+    themes = [b["key"] for b in ESClient(index=ES_INDEX).get_aggregations(names=["themes"])["themes"]]
+    if not themes:
+        print(f"Index '{ES_INDEX}' vide ou injoignable.")
+        return
+
+    results = {}
+    try:
+        for routing in LAYOUTS:
+            name = f"{ES_INDEX}_bench_{routing}"
+            print(f"Copie de '{ES_INDEX}' vers '{name}' ({args.shards} shards, routage {routing})...")
+            create_copy(es, name, args.shards, routing)
+            results[routing] = bench(ESClient(index=name, routing=routing), themes, args.repeat)
+    finally:
+        for routing in LAYOUTS:
+            es.indices.delete(index=f"{ES_INDEX}_bench_{routing}", ignore_unavailable=True)
+
+    header = f"{'opération':<20}" + "".join(f"{r + ' p50':>18}{'p95':>10}" for r in LAYOUTS) + f"{'gain p50':>10}"
+    print(f"\n{header}\n" + "-" * len(header))
+    for operation in results[LAYOUTS[0]]:
+        line = f"{operation:<20}"
+        for routing in LAYOUTS:
+            values = results[routing][operation]
+            line += f"{statistics.median(values):>15.2f} ms{percentile(values, 95):>7.2f} ms"
+        before = statistics.median(results["doc_id"][operation])
+        after = statistics.median(results["theme"][operation])
+        line += f"{(1 - after / before) * 100:>9.0f}%"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Mesure du temps de démarrage à froid de l'application Streamlit.
+Chaque mesure tourne dans un interpréteur neuf (aucun module déjà importé) :
+- temps jusqu'au premier rendu complet de la page d'accueil (AppTest) ;
+- temps d'import des dépendances lourdes, pour suivre ce que coûterait
+  leur chargement au démarrage.
+
+Usage : uv run python webapp/tests/bench_startup.py [--runs 5]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_PATH = Path(__file__).parent.parent / "app.py"
+
+# Temps jusqu'au premier rendu de la page d'accueil
+HOME_SNIPPET = f"""
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({str(APP_PATH)!r})
+at.run(timeout=60)
+assert not at.exception, at.exception
+print(time.perf_counter() - start)
+"""
+
+# Temps d'import d'un module seul
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+HEAVY_MODULES = ["streamlit", "elasticsearch", "pandas", "plotly.express", "PIL.Image"]
+
+
+def measure(snippet: str, runs: int) -> list[float]:
+    """Exécute le snippet dans `runs` interpréteurs neufs et renvoie les durées (s)."""
+    durations = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", snippet],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        durations.append(float(output.strip().splitlines()[-1]))
+    return durations
+
+
+def report(label: str, durations: list[float]) -> None:
+    print(
+        f"{label:<28} médiane {statistics.median(durations) * 1000:8.1f} ms"
+        f"   min {min(durations) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de mesures par cas")
+    args = parser.parse_args()
+
+    print(f"Démarrage à froid ({args.runs} mesures par cas)\n")
+    report("Accueil : premier rendu", measure(HOME_SNIPPET, args.runs))
+    print()
+    for module in HEAVY_MODULES:
+        report(f"import {module}", measure(IMPORT_SNIPPET.format(module=module), args.runs))
+
+
+if __name__ == "__main__":
+    main()
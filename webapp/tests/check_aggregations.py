@@ -0,0 +1,44 @@
+"""
+Vérifie que l'instantané des statistiques (scripts/build_stats_snapshot.py)
+calcule exactement les agrégations du tableau de bord (AGGREGATIONS dans
+utils/es_client.py). Les deux images Docker ne partagent pas de code : la
+définition est dupliquée, et ce contrôle échoue dès qu'elles divergent.
+
+Usage : uv run python webapp/tests/check_aggregations.py
+"""
+import json
+import sys
+from pathlib import Path
+
+# Ajouter le dossier webapp au path pour les imports
+webapp_dir = Path(__file__).parent.parent
+if str(webapp_dir) not in sys.path:
+    sys.path.insert(0, str(webapp_dir))
+
+# Script de l'instantané, exécuté dans l'image du scraper
+scripts_dir = webapp_dir.parent / "scripts"
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from build_stats_snapshot import AGGS
+from utils.es_client import AGGREGATIONS
+
+
+def main():
+    failures = 0
+    for name in sorted(set(AGGREGATIONS) | set(AGGS)):
+        webapp, snapshot = AGGREGATIONS.get(name), AGGS.get(name)
+        if webapp == snapshot:
+            print(f"  {name} : ok")
+            continue
+        failures += 1
+        print(f"  {name} : ÉCHEC")
+        print(f"    webapp   : {json.dumps(webapp, sort_keys=True)}")
+        print(f"    snapshot : {json.dumps(snapshot, sort_keys=True)}")
+
+    print("OK" if not failures else f"{failures} agrégation(s) divergente(s).")
+    sys.exit(0 if not failures else 1)
+
+
+if __name__ == "__main__":
+    main()
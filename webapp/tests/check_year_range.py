@@ -0,0 +1,90 @@
+"""
+Vérifie le filtre d'intervalle d'années du tableau de bord sur des dates
+complètes (dd/MM/yyyy, comme les écrit le scraper) : chaque année choisie doit
+être comptée en entier, à l'identique par le moteur embarqué et par
+Elasticsearch. Elasticsearch est interrogé sur un index de test créé puis
+supprimé, et ignoré s'il n'est pas joignable.
+
+Usage : uv run python webapp/tests/check_year_range.py
+"""
+import copy
+import sys
+from pathlib import Path
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+
+# Ajouter le dossier webapp au path pour les imports
+webapp_dir = Path(__file__).parent.parent
+if str(webapp_dir) not in sys.path:
+    sys.path.insert(0, str(webapp_dir))
+
+# Mapping canonique, partagé avec le scraper (scripts/init_es_index.py)
+scripts_dir = webapp_dir.parent / "scripts"
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from init_es_index import ES_HOST, ES_INDEX, MAPPING
+from utils.es_client import ESClient
+from utils.memory_client import MemoryClient
+
+TEST_INDEX = f"{ES_INDEX}_check_year_range"
+
+# Début, milieu et fin de chaque année
+DATES = [
+    f"{day}/{year}"
+    for year in (2014, 2015, 2016)
+    for day in ("01/01", "02/01", "15/06", "31/12")
+]
+DOCS = [
+    {"doc_id": f"date-{i:02d}", "title": f"Ouvrage {i}", "theme": "Test", "date_parution": date}
+    for i, date in enumerate(DATES)
+]
+
+# (filtre date_parution, nombre attendu)
+CASES = [
+    # Filtre du tableau de bord (render_dashboard_filters), années 2014 à 2015
+    ({"gte": "2014", "lt": "2016", "format": "yyyy"}, 8),
+    ({"gte": "2015", "lt": "2016", "format": "yyyy"}, 4),
+    # "lte" / "gt" sur une année seule : fin du 1er janvier
+    ({"gte": "2014", "lte": "2015", "format": "yyyy"}, 5),
+    ({"gt": "2014", "format": "yyyy"}, 11),
+]
+
+
+def check(name: str, count) -> bool:
+    failures = 0
+    for bounds, expected in CASES:
+        got = count({"date_parution": bounds})
+        status = "ok" if got == expected else "ÉCHEC"
+        failures += got != expected
+        print(f"  [{name}] {bounds} -> {got} (attendu {expected}) {status}")
+    return failures == 0
+
+
+def main():
+    ok = check("mémoire", MemoryClient(copy.deepcopy(DOCS)).get_count)
+
+    es = Elasticsearch(ES_HOST)
+    if not es.ping():
+        print(f"Elasticsearch injoignable ({ES_HOST}) : vérification ignorée.")
+    else:
+        mapping = copy.deepcopy(MAPPING)
+        mapping["settings"]["number_of_replicas"] = 0
+        mapping["mappings"].pop("_routing", None)
+        if es.indices.exists(index=TEST_INDEX):
+            es.indices.delete(index=TEST_INDEX)
+        es.indices.create(index=TEST_INDEX, body=mapping)
+        try:
+            bulk(es, ({"_index": TEST_INDEX, "_id": d["doc_id"], "_source": d} for d in DOCS), refresh=True)
+            ok &= check("elasticsearch", ESClient(index=TEST_INDEX, routing="doc_id").get_count)
+        finally:
+            es.indices.delete(index=TEST_INDEX)
+    es.close()
+
+    print("OK" if ok else "Des vérifications ont échoué.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Test de charge des chemins de recherche et de statistiques.
+Rejoue un mélange réaliste d'opérations à travers le client de recherche
+(requêtes texte avec fautes de frappe, filtres par facettes, pages
+profondes, ouvertures de fiches, chargements des statistiques), avec N
+utilisateurs simultanés, puis affiche le débit et les latences
+p50/p95/p99 par opération.
+
+Les requêtes sont tirées des fixtures (titres, auteurs, éditeurs, thèmes).
+Le client renvoyant un résultat vide plutôt que de lever en cas d'échec,
+une recherche sans plan, une fiche introuvable ou un comptage nul sont
+comptés comme des erreurs.
+
+Usage :
+    uv run python webapp/tests/load_test.py --backend memory --concurrency 8 --duration 30
+    uv run python webapp/tests/load_test.py --backend elasticsearch --concurrency 32
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Ajouter le dossier webapp au path pour les imports
+webapp_dir = Path(__file__).parent.parent
+if str(webapp_dir) not in sys.path:
+    sys.path.insert(0, str(webapp_dir))
+
+from utils.es_client import ESClient
+from utils.memory_client import MemoryClient
+from utils.query_stats import percentile
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures.json"
+
+# Poids de chaque opération dans le mélange
+MIX = {
+    "search_text": 30,
+    "search_fuzzy": 15,
+    "search_facets": 15,
+    "search_deep_page": 10,
+    "open_dialog": 20,
+    "load_stats": 10,
+}
+
+
+class Workload:
+    """Génère des opérations aléatoires à partir des fixtures."""
+
+    def __init__(self, docs: list[dict], total: int, page_size: int = 20):
+        # Dernière page non vide : les pages profondes (10 à 50) sont
+        # ramenées dans l'index, sans quoi elles ne renvoient rien
+        self.last_page = max(1, -(-total // page_size))
+        self.doc_ids = [doc["doc_id"] for doc in docs]
+        self.words = sorted({
+            word for doc in docs
+            for word in (doc.get("title") or "").split() if len(word) > 4
+        })
+        self.authors = sorted({a for doc in docs for a in doc.get("authors") or []})
+        self.editeurs = sorted({doc["editeur"] for doc in docs if doc.get("editeur")})
+        self.themes = sorted({doc["theme"] for doc in docs if doc.get("theme")})
+
+    @staticmethod
+    def typo(word: str, rng: random.Random) -> str:
+        """Introduit une faute : lettre supprimée, doublée ou inversée."""
+        i = rng.randrange(1, len(word) - 1)
+        kind = rng.choice(("delete", "double", "swap"))
+        if kind == "delete":
+            return word[:i] + word[i + 1:]
+        if kind == "double":
+            return word[:i] + word[i] + word[i:]
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+
+    @staticmethod
+    def searched(result: dict) -> dict:
+        """Le client signale une recherche en échec par un plan absent."""
+        if result["plan"] is None:
+            raise RuntimeError("recherche en échec")
+        return result
+
+    def run(self, client, operation: str, rng: random.Random) -> None:
+        """Exécute une opération ; lève si le client renvoie un résultat d'échec."""
+        if operation == "search_text":
+            query = rng.choice(self.words + self.authors)
+            self.searched(client.search(query=query))
+        elif operation == "search_fuzzy":
+            self.searched(client.search(query=self.typo(rng.choice(self.words), rng)))
+        elif operation == "search_facets":
+            filters = {"theme": [rng.choice(self.themes)]}
+            if rng.random() < 0.5:
+                filters["editeur"] = [rng.choice(self.editeurs)]
+            self.searched(client.search(query=rng.choice(["", *self.words[:20]]), filters=filters))
+        elif operation == "search_deep_page":
+            page = rng.randint(min(10, self.last_page), min(50, self.last_page))
+            if not self.searched(client.search(page=page))["hits"]:
+                raise RuntimeError(f"page {page} vide")
+        elif operation == "open_dialog":
+            doc_id = rng.choice(self.doc_ids)
+            if client.get_by_id(doc_id) is None:
+                raise RuntimeError(f"fiche {doc_id} introuvable")
+            client.get_similar(doc_id)
+        elif operation == "load_stats":
+            if client.get_stats_snapshot() is None:
+                client.get_aggregations(raise_errors=True)
+                if not client.get_count():
+                    raise RuntimeError("comptage en échec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=["elasticsearch", "memory"], default="elasticsearch")
+    parser.add_argument("--concurrency", type=int, default=8, help="Utilisateurs simultanés")
+    parser.add_argument("--duration", type=float, default=30, help="Durée du test (s)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(FIXTURES_PATH, "r", encoding="utf-8") as f:
+        docs = json.load(f)
+    client = MemoryClient(docs) if args.backend == "memory" else ESClient()
+    workload = Workload(docs, client.get_count())
+
+    operations, weights = list(MIX), list(MIX.values())
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def user(worker: int) -> None:
+        rng = random.Random(args.seed + worker)
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                workload.run(client, operation, rng)
+            except Exception:
+                with lock:
+                    errors[operation] += 1
+                continue
+            local[operation].append((time.perf_counter() - start) * 1000)
+        with lock:
+            for operation, values in local.items():
+                timings[operation].extend(values)
+
+    print(f"Backend {args.backend}, {args.concurrency} utilisateurs, {args.duration:.0f} s...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(user, range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in timings.values())
+    print(f"\n{total} opérations en {elapsed:.1f} s — {total / elapsed:.1f} op/s\n")
+    header = f"{'opération':<18}{'nombre':>8}{'op/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'erreurs':>9}"
+    print(header)
+    print("-" * len(header))
+    for operation in operations:
+        values = timings.get(operation, [])
+        if not values:
+            if errors[operation]:
+                print(f"{operation:<18}{0:>8}{'-':>9}{'-':>10}{'-':>10}{'-':>10}{errors[operation]:>9}")
+            continue
+        print(
+            f"{operation:<18}{len(values):>8}{len(values) / elapsed:>9.1f}"
+            f"{percentile(values, 50):>8.1f}ms{percentile(values, 95):>8.1f}ms"
+            f"{percentile(values, 99):>8.1f}ms{errors[operation]:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
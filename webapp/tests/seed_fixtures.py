@@ -3,12 +3,17 @@ Script pour injecter les fixtures dans Elasticsearch pour le développement.
 Permet de travailler sur le frontend sans attendre le scraping complet.
 """
 import json
+import sys
 from pathlib import Path
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
 
-# Configuration
-ES_HOST = "http://localhost:9200"
-ES_INDEX = "cairn_ouvrages"
+# Mapping canonique, partagé avec le scraper (scripts/init_es_index.py)
+scripts_dir = Path(__file__).parent.parent.parent / "scripts"
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+from init_es_index import ES_HOST, ES_INDEX, ES_ROUTING, MAPPING
 
 def main():
     """Crée l'index et injecte les données de test."""
@@ -21,31 +26,9 @@ def main():
         print(f"Suppression de l'index existant '{ES_INDEX}'...")
         es.indices.delete(index=ES_INDEX)
     
-    # Créer l'index avec le mapping approprié
+    # Créer l'index avec le mapping canonique
     print(f"Création de l'index '{ES_INDEX}'...")
-    mapping = {
-        "mappings": {
-            "properties": {
-                "title": {"type": "text", "analyzer": "french"},
-                "subtitle": {"type": "text", "analyzer": "french"},
-                "authors": {"type": "keyword"},
-                "collection": {"type": "keyword"},
-                "editeur": {"type": "keyword"},
-                "date_parution": {"type": "date", "format": "yyyy-MM-dd||yyyy"},
-                "date_mise_en_ligne": {"type": "date", "format": "yyyy-MM-dd||yyyy"},
-                "pages": {"type": "integer"},
-                "price": {"type": "float"},
-                "description": {"type": "text", "analyzer": "french"},
-                "isbn": {"type": "keyword"},
-                "theme": {"type": "keyword"},
-                "image_url": {"type": "keyword", "index": False},
-                "url": {"type": "keyword", "index": False},
-                "doc_id": {"type": "keyword"}
-            }
-        }
-    }
-    
-    es.indices.create(index=ES_INDEX, body=mapping)
+    es.indices.create(index=ES_INDEX, body=MAPPING)
     
     # Charger les fixtures
     fixtures_path = Path(__file__).parent / "fixtures.json"
@@ -54,10 +37,13 @@ def main():
     with open(fixtures_path, "r", encoding="utf-8") as f:
         fixtures = json.load(f)
     
-    # Indexer chaque document
+    # Indexer tous les documents en une requête bulk
     print(f"Indexation de {len(fixtures)} documents...")
-    for doc in fixtures:
-        es.index(index=ES_INDEX, id=doc["doc_id"], document=doc)
+    bulk(es, (
+        {"_index": ES_INDEX, "_id": doc["doc_id"], "_source": doc,
+         **({"_routing": doc["theme"]} if ES_ROUTING == "theme" else {})}
+        for doc in fixtures
+    ))
     
     # Rafraîchir l'index pour rendre les documents immédiatement disponibles
     es.indices.refresh(index=ES_INDEX)
@@ -0,0 +1,175 @@
+"""
+Construction des graphiques Plotly de la page de statistiques.
+Ce module importe pandas et Plotly : la page ne l'importe qu'au moment de
+construire un graphique, pour ne pas alourdir le démarrage de l'application.
+"""
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def themes_pie(buckets: list[dict]) -> go.Figure:
+    """Distribution par thème (donut)."""
+    themes_df = pd.DataFrame(buckets)
+    return px.pie(
+        themes_df,
+        values="doc_count",
+        names="key",
+        title="Distribution des ouvrages par thème",
+        hole=0.3,  # Donut chart
+    )
+
+
+def editeurs_bar(buckets: list[dict]) -> go.Figure:
+    """Top 10 des éditeurs."""
+    editeurs_df = pd.DataFrame(buckets[:10])
+    fig = px.bar(
+        editeurs_df,
+        x="doc_count",
+        y="key",
+        orientation="h",
+        title="Nombre d'ouvrages par éditeur",
+        labels={"doc_count": "Nombre d'ouvrages", "key": "Éditeur"},
+        color="doc_count",
+        color_continuous_scale="Blues",
+    )
+    fig.update_layout(yaxis={'categoryorder':'total ascending'})
+    return fig
+
+
+def prix_histogram(buckets: list[dict]) -> go.Figure:
+    """Répartition par tranche de prix."""
+    prix_df = pd.DataFrame(buckets)
+    prix_df["key"] = prix_df["key"].astype(float)
+    return px.bar(
+        prix_df,
+        x="key",
+        y="doc_count",
+        title="Répartition par tranche de prix (10€)",
+        labels={"key": "Prix (€)", "doc_count": "Nombre d'ouvrages"},
+        color="doc_count",
+        color_continuous_scale="Greens",
+    )
+
+
+def pages_histogram(buckets: list[dict]) -> go.Figure:
+    """Répartition par tranche de pages."""
+    pages_df = pd.DataFrame(buckets)
+    pages_df["key"] = pages_df["key"].astype(int)
+    return px.bar(
+        pages_df,
+        x="key",
+        y="doc_count",
+        title="Répartition par tranche de pages (100 p.)",
+        labels={"key": "Nombre de pages", "doc_count": "Nombre d'ouvrages"},
+        color="doc_count",
+        color_continuous_scale="Oranges",
+    )
+
+
+def annees_line(buckets: list[dict]) -> go.Figure:
+    """Évolution des publications par année."""
+    annees_df = pd.DataFrame(buckets)
+    annees_df["key"] = pd.to_datetime(annees_df["key"], unit="ms")
+    annees_df = annees_df.sort_values("key")
+    fig = px.line(
+        annees_df,
+        x="key",
+        y="doc_count",
+        title="Nombre d'ouvrages publiés par année",
+        labels={"key": "Année", "doc_count": "Nombre d'ouvrages"},
+        markers=True,
+    )
+    fig.update_traces(line_color="#1f77b4", line_width=3)
+    return fig
+
+
+def collections_bar(buckets: list[dict]) -> go.Figure:
+    """Top 15 des collections."""
+    collections_df = pd.DataFrame(buckets[:15])
+    fig = go.Figure(go.Bar(
+        x=collections_df["doc_count"],
+        y=collections_df["key"],
+        orientation='h',
+        marker=dict(
+            color=collections_df["doc_count"],
+            colorscale='Viridis',
+        )
+    ))
+    fig.update_layout(
+        title="Top 15 des collections",
+        xaxis_title="Nombre d'ouvrages",
+        yaxis_title="Collection",
+        yaxis={'categoryorder':'total ascending'},
+        height=500,
+    )
+    return fig
+
+
+def auteurs_bar(buckets: list[dict]) -> go.Figure:
+    """Top 20 des auteurs."""
+    auteurs_df = pd.DataFrame(buckets[:20])
+    fig = px.bar(
+        auteurs_df,
+        x="doc_count",
+        y="key",
+        orientation="h",
+        title="Top 20 des auteurs par nombre d'ouvrages",
+        labels={"doc_count": "Nombre d'ouvrages", "key": "Auteur"},
+        color="doc_count",
+        color_continuous_scale="Purples",
+    )
+    fig.update_layout(
+        yaxis={'categoryorder': 'total ascending'},
+        height=500,
+    )
+    return fig
+
+
+def _runs_by_theme(runs: list[dict]) -> pd.DataFrame:
+    """Une ligne par (crawl, thème) à partir des résumés de crawl."""
+    rows = [
+        {"started_at": run["started_at"], "theme": theme, **counts}
+        for run in runs
+        for theme, counts in run["themes"].items()
+    ]
+    runs_df = pd.DataFrame(rows)
+    runs_df["started_at"] = pd.to_datetime(runs_df["started_at"])
+    return runs_df.sort_values("started_at")
+
+
+def catalogue_evolution(runs: list[dict]) -> go.Figure:
+    """Taille du catalogue par thème après chaque crawl."""
+    runs_df = _runs_by_theme(runs)
+    return px.area(
+        runs_df,
+        x="started_at",
+        y="catalogue",
+        color="theme",
+        title="Taille du catalogue après chaque crawl",
+        labels={"started_at": "Crawl", "catalogue": "Nombre d'ouvrages", "theme": "Thème"},
+        markers=True,
+    )
+
+
+def crawl_changes(runs: list[dict]) -> go.Figure:
+    """Ouvrages ajoutés, retirés et changements de prix par crawl."""
+    runs_df = _runs_by_theme(runs).groupby("started_at", as_index=False)[
+        ["added", "price_changed", "removed"]
+    ].sum()
+    runs_df["removed"] = -runs_df["removed"]
+    changes_df = runs_df.melt(id_vars="started_at", var_name="event", value_name="count")
+    changes_df["event"] = changes_df["event"].map({
+        "added": "Ajoutés", "price_changed": "Prix modifié", "removed": "Retirés",
+    })
+    fig = px.bar(
+        changes_df,
+        x="started_at",
+        y="count",
+        color="event",
+        title="Changements détectés à chaque crawl",
+        labels={"started_at": "Crawl", "count": "Nombre d'ouvrages", "event": "Événement"},
+        color_discrete_map={"Ajoutés": "#2ca02c", "Prix modifié": "#ff7f0e", "Retirés": "#d62728"},
+    )
+    fig.update_layout(barmode="relative")
+    return fig
@@ -1,31 +1,53 @@
 """
 Composants réutilisables pour l'interface Streamlit.
 """
+from typing import Callable
+
 import streamlit as st
 
+from utils.covers import CoverCache, CARD_SIZE, DIALOG_SIZE
+
+
+@st.cache_resource
+def get_cover_cache() -> CoverCache:
+    """Cache de couvertures partagé par toutes les sessions."""
+    return CoverCache()
+
+
+def render_cover(image_url: str, size: tuple[int, int], placeholder: str) -> None:
+    """
+    Affiche une couverture depuis le cache local.
+    
+    Args:
+        image_url: URL distante de la couverture
+        size: Dimensions de la vignette
+        placeholder: Markdown affiché si la couverture est indisponible
+    """
+    cover = get_cover_cache().get(image_url, size) if image_url else None
+    if cover:
+        st.image(str(cover), use_container_width=True)
+    else:
+        st.markdown(placeholder)
+
 
 def render_ouvrage_card(hit: dict) -> None:
     """
     Affiche une carte d'ouvrage dans les résultats de recherche.
     
     Args:
-        hit: Document Elasticsearch (avec _id et _source)
+        hit: Document Elasticsearch (avec _id, _source et éventuellement
+             highlight)
     """
     source = hit["_source"]
     doc_id = hit["_id"]
+    snippets = hit.get("highlight", {}).get("description", [])
     
     with st.container():
         col1, col2 = st.columns([1, 4])
         
         # Image de couverture
         with col1:
-            if source.get("image_url"):
-                try:
-                    st.image(source["image_url"], use_container_width=True)
-                except Exception:
-                    st.markdown("📚")
-            else:
-                st.markdown("📚")
+            render_cover(source.get("image_url"), CARD_SIZE, "📚")
         
         # Informations de l'ouvrage
         with col2:
@@ -63,6 +85,16 @@ def render_ouvrage_card(hit: dict) -> None:
                     info.append(f"**Pages :** {pages}")
                 st.markdown(" | ".join(info))
             
+            # Extrait de description (la version complète est dans la fiche),
+            # suivi de "…" seulement s'il s'arrête avant la fin du texte
+            if snippets:
+                doc_store = st.session_state.get("doc_store")
+                doc = doc_store.get(doc_id) if doc_store is not None else None
+                description = (doc or {}).get("description")
+                plain = snippets[0].replace("**", "").rstrip()
+                truncated = description is None or not description.rstrip().endswith(plain)
+                st.caption(f"{snippets[0]}…" if truncated else snippets[0])
+            
             # Theme + lien vers fiche
             col_theme, col_btn = st.columns([3, 1])
             with col_theme:
@@ -80,14 +112,19 @@ def render_ouvrage_card(hit: dict) -> None:
 def show_ouvrage_dialog(doc_id: str) -> None:
     """
     Affiche la fiche détaillée d'un ouvrage dans un dialog modal.
+    Le document est lu dans le store de la session s'il y a déjà été
+    chargé par la recherche, sinon récupéré depuis Elasticsearch.
     """
-    from utils.es_client import ESClient
+    from utils.es_client import create_client
 
     @st.cache_resource
     def get_es_client():
-        return ESClient()
+        return create_client()
 
-    doc = get_es_client().get_by_id(doc_id)
+    doc_store = st.session_state.get("doc_store")
+    doc = doc_store.get(doc_id) if doc_store is not None else None
+    if doc is None:
+        doc = get_es_client().get_by_id(doc_id)
 
     if not doc:
         st.error(f"Ouvrage non trouvé (ID: {doc_id})")
@@ -96,13 +133,7 @@ def show_ouvrage_dialog(doc_id: str) -> None:
     col1, col2 = st.columns([1, 2])
 
     with col1:
-        if doc.get("image_url"):
-            try:
-                st.image(doc["image_url"], use_container_width=True)
-            except Exception:
-                st.markdown("### 📚")
-        else:
-            st.markdown("### 📚")
+        render_cover(doc.get("image_url"), DIALOG_SIZE, "### 📚")
 
         if doc.get("url"):
             st.markdown(f"[🔗 Voir sur Cairn.info]({doc['url']})")
@@ -157,12 +188,24 @@ def show_ouvrage_dialog(doc_id: str) -> None:
     description = doc.get("description", "Aucune description disponible.")
     st.markdown(description)
 
+    # Préchargés avec le document par la recherche (cf. ESClient.search)
+    similar = doc.get("_similar")
+    if similar is None:
+        similar = get_es_client().get_similar(doc_id)
+    if similar:
+        st.divider()
+        st.markdown("### 📚 Ouvrages similaires")
+        for other in similar:
+            line = f"[{other['title']}]({other['url']})" if other.get("url") else other["title"]
+            if other.get("authors"):
+                line += f" — {', '.join(other['authors'])}"
+            st.markdown(f"- {line}")
+
 
 def render_sidebar_filters(
     themes: list[dict],
     editeurs: list[dict],
-    collections: list[dict],
-    auteurs: list[dict],
+    load_facet_page: Callable[..., dict],
 ) -> dict:
     """
     Affiche les filtres dans la sidebar et retourne les valeurs sélectionnées.
@@ -170,8 +213,8 @@ def render_sidebar_filters(
     Args:
         themes: Liste des buckets de thèmes
         editeurs: Liste des buckets d'éditeurs
-        collections: Liste des buckets de collections
-        auteurs: Liste des buckets d'auteurs
+        load_facet_page: Fonction (field, filters, prefix, after) -> page de
+                         facette, cf. ESClient.get_facet_page
         
     Returns:
         Dictionnaire des filtres sélectionnés
@@ -203,31 +246,179 @@ def render_sidebar_filters(
             # Extraire juste le nom (avant le compteur)
             filters["editeur"] = [opt.split(" (")[0] for opt in selected_editeurs]
     
-    # Filtre par collection
-    if collections:
-        collection_options = [f"{bucket['key']} ({bucket['doc_count']})" for bucket in collections[:10]]
-        selected_collections = st.sidebar.multiselect(
-            "Collection",
-            collection_options,
-            key="filter_collection"
+    # Filtres par collection et par auteur : facettes paginées avec recherche
+    selected_collections = render_facet_browser(
+        "Collection", "collection", load_facet_page, dict(filters), key="filter_collection"
+    )
+    if selected_collections:
+        filters["collection"] = selected_collections
+    
+    selected_auteurs = render_facet_browser(
+        "Auteur", "authors", load_facet_page, dict(filters), key="filter_auteur"
+    )
+    if selected_auteurs:
+        filters["authors"] = selected_auteurs
+    
+    return filters
+
+
+def render_facet_browser(
+    label: str,
+    field: str,
+    load_facet_page: Callable[..., dict],
+    filters: dict,
+    key: str,
+) -> list[str]:
+    """
+    Affiche une facette parcourable : recherche par préfixe et chargement
+    des valeurs suivantes à la demande.
+    
+    Args:
+        label: Libellé de la facette
+        field: Champ Elasticsearch de la facette
+        load_facet_page: Fonction de chargement d'une page de valeurs
+        filters: Filtres des facettes précédentes
+        key: Clé Streamlit du multiselect
+        
+    Returns:
+        Liste des valeurs sélectionnées
+    """
+    prefix = st.sidebar.text_input(
+        f"Rechercher : {label.lower()}",
+        key=f"{key}_prefix",
+        placeholder="Début du nom...",
+    )
+    
+    # Repartir de la première page quand le préfixe ou les filtres changent
+    signature = (prefix, repr(sorted(filters.items())))
+    state = st.session_state.get(f"{key}_state")
+    if state is None or state["signature"] != signature:
+        result = load_facet_page(field, filters=filters, prefix=prefix)
+        state = {
+            "signature": signature,
+            "buckets": result["buckets"],
+            "after": result["after_key"],
+        }
+        st.session_state[f"{key}_state"] = state
+    
+    counts = {bucket["key"]: bucket["doc_count"] for bucket in state["buckets"]}
+    selected = st.session_state.get(key, [])
+    options = list(dict.fromkeys(selected + list(counts)))
+    
+    chosen = st.sidebar.multiselect(
+        label,
+        options,
+        key=key,
+        format_func=lambda value: f"{value} ({counts[value]})" if value in counts else value,
+    )
+    
+    if state["after"] and st.sidebar.button("⬇️ Plus de résultats", key=f"{key}_more"):
+        result = load_facet_page(field, filters=filters, prefix=prefix, after=state["after"])
+        state["buckets"] = state["buckets"] + result["buckets"]
+        state["after"] = result["after_key"]
+        st.rerun()
+    
+    return chosen
+
+
+def render_dashboard_filters(aggs: dict) -> dict:
+    """
+    Affiche les filtres du tableau de bord dans la sidebar.
+    
+    Args:
+        aggs: Agrégations non filtrées (pour les options et les bornes)
+        
+    Returns:
+        Dictionnaire des filtres sélectionnés (listes de valeurs ou
+        intervalles {"gte", "lte"})
+    """
+    st.sidebar.markdown("## 🎛️ Filtres du tableau de bord")
+    
+    filters = {}
+    
+    # Filtre par thème
+    if aggs["themes"]:
+        selected_themes = st.sidebar.multiselect(
+            "Thème",
+            [bucket["key"] for bucket in aggs["themes"]],
+            key="dashboard_theme"
         )
-        if selected_collections:
-            filters["collection"] = [opt.split(" (")[0] for opt in selected_collections]
-    
-    # Filtre par auteur
-    if auteurs:
-        auteur_options = [f"{bucket['key']} ({bucket['doc_count']})" for bucket in auteurs[:20]]
-        selected_auteurs = st.sidebar.multiselect(
-            "Auteur",
-            auteur_options,
-            key="filter_auteur"
+        if selected_themes:
+            filters["theme"] = selected_themes
+    
+    # Filtre par éditeur
+    if aggs["editeurs"]:
+        selected_editeurs = st.sidebar.multiselect(
+            "Éditeur",
+            [bucket["key"] for bucket in aggs["editeurs"]],
+            key="dashboard_editeur"
+        )
+        if selected_editeurs:
+            filters["editeur"] = selected_editeurs
+    
+    # Intervalle d'années de parution
+    years = [int(bucket["key_as_string"]) for bucket in aggs["annees"]]
+    if len(years) > 1:
+        year_min, year_max = min(years), max(years)
+        start, end = st.sidebar.slider(
+            "Années de parution",
+            year_min, year_max, (year_min, year_max),
+            key="dashboard_annees"
         )
-        if selected_auteurs:
-            filters["authors"] = [opt.split(" (")[0] for opt in selected_auteurs]
+        if (start, end) != (year_min, year_max):
+            # Borne haute exclusive : "lte": "2015" s'arrêterait au 1er janvier 2015
+            filters["date_parution"] = {"gte": str(start), "lt": str(end + 1), "format": "yyyy"}
+    
+    # Intervalle de prix (bornes des tranches de 10 €)
+    prices = [float(bucket["key"]) for bucket in aggs["prix_histogram"]]
+    if len(prices) > 1:
+        price_min, price_max = int(min(prices)), int(max(prices)) + 10
+        low, high = st.sidebar.slider(
+            "Prix (€)",
+            price_min, price_max, (price_min, price_max),
+            key="dashboard_prix"
+        )
+        if (low, high) != (price_min, price_max):
+            filters["price"] = {"gte": low, "lte": high}
     
     return filters
 
 
+def render_diagnostics() -> None:
+    """
+    Affiche dans la sidebar les temps de réponse par méthode de ESClient
+    et les dernières requêtes lentes.
+    """
+    from utils.query_stats import RECORDER
+
+    with st.sidebar.expander("⏱️ Diagnostics des requêtes"):
+        rows = RECORDER.summary()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("Aucune requête enregistrée.")
+
+        if RECORDER.slow_queries:
+            st.markdown(f"**Requêtes lentes** (> {RECORDER.slow_ms:.0f} ms)")
+            for entry in reversed(RECORDER.slow_queries):
+                st.caption(
+                    f"{entry['time']} — {entry['method']} : {entry['wall_ms']} ms "
+                    f"(took {entry['took_ms']} ms)"
+                )
+                if entry["body"]:
+                    st.json(entry["body"], expanded=False)
+
+    from utils import profiling
+    if profiling.ENABLED:
+        with st.sidebar.expander("🔥 Profil des reruns"):
+            samples = profiling.summary()
+            if samples:
+                st.dataframe(samples, hide_index=True, use_container_width=True)
+            else:
+                st.caption("Aucun rerun profilé pour l'instant.")
+            st.caption(f"Piles au format folded dans {profiling.PROFILE_DIR}/")
+
+
 def render_pagination(total: int, page: int, size: int) -> int:
     """
     Affiche les contrôles de pagination et retourne la nouvelle page.
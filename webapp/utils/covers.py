@@ -0,0 +1,156 @@
+"""
+Cache disque des couvertures d'ouvrages.
+Télécharge chaque couverture une seule fois, la redimensionne aux dimensions
+d'affichage et la sert ensuite localement (éviction LRU bornée en taille).
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+# Dimensions maximales (largeur, hauteur) des vignettes
+CARD_SIZE = (200, 300)
+DIALOG_SIZE = (400, 600)
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / ".cover_cache"
+FETCH_TIMEOUT = 5
+# Après un échec, nouvel essai au bout de RETRY_AFTER secondes, délai
+# doublé à chaque échec suivant jusqu'à RETRY_MAX
+RETRY_AFTER = 60
+RETRY_MAX = 3600
+# URL en échec mémorisées au plus (les plus anciennes sont oubliées)
+FAILED_MAX_ENTRIES = 1000
+# Taille maximale d'une couverture téléchargée (au-delà, elle est refusée)
+MAX_COVER_BYTES = 5 * 1024 * 1024
+
+
+class CoverCache:
+    """Cache LRU de vignettes sur disque, indexé par URL et dimensions."""
+
+    def __init__(
+        self,
+        cache_dir: str = None,
+        max_bytes: int = None,
+    ):
+        """
+        Initialise le cache et mesure son occupation actuelle.
+
+        Args:
+            cache_dir: Dossier des vignettes (par défaut depuis .env)
+            max_bytes: Taille maximale du cache en octets (par défaut depuis .env)
+        """
+        self.cache_dir = Path(cache_dir or os.getenv("COVER_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.max_bytes = max_bytes or int(os.getenv("COVER_CACHE_MAX_MB", 200)) * 1024 * 1024
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # URL -> (nombre d'échecs consécutifs, instant du prochain essai),
+        # LRU bornée à FAILED_MAX_ENTRIES
+        self._failed: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.jpg"))
+
+    def _path(self, url: str, size: tuple[int, int]) -> Path:
+        key = hashlib.sha1(f"{url}|{size[0]}x{size[1]}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.jpg"
+
+    def get(self, url: str, size: tuple[int, int] = CARD_SIZE) -> Optional[Path]:
+        """
+        Retourne le chemin local de la vignette, en la téléchargeant au besoin.
+
+        Args:
+            url: URL distante de la couverture
+            size: Dimensions maximales de la vignette
+
+        Returns:
+            Chemin du fichier JPEG ou None si la couverture est indisponible
+        """
+        if not url:
+            return None
+        failure = self._failed.get(url)
+        if failure and time.monotonic() < failure[1]:
+            return None
+
+        path = self._path(url, size)
+        if path.exists():
+            # Marque l'entrée comme récemment utilisée
+            try:
+                os.utime(path)
+                return path
+            except FileNotFoundError:
+                pass  # évincée entre-temps par un autre thread
+
+        # Import différé : Pillow n'est chargé qu'au premier téléchargement
+        from PIL import Image
+
+        try:
+            with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+                data = response.read(MAX_COVER_BYTES + 1)
+            if len(data) > MAX_COVER_BYTES:
+                raise ValueError(f"couverture de plus de {MAX_COVER_BYTES} octets")
+            image = Image.open(io.BytesIO(data))
+            image.thumbnail(size)
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=85)
+        except Exception as e:
+            print(f"Erreur lors du téléchargement de la couverture {url} : {e}")
+            failures = (failure[0] if failure else 0) + 1
+            delay = min(RETRY_MAX, RETRY_AFTER * 2 ** (failures - 1))
+            with self._lock:
+                self._failed[url] = (failures, time.monotonic() + delay)
+                self._failed.move_to_end(url)
+                while len(self._failed) > FAILED_MAX_ENTRIES:
+                    self._failed.popitem(last=False)
+            return None
+
+        with self._lock:
+            self._failed.pop(url, None)
+        self._store(path, buffer.getvalue())
+        return path
+
+    def prefetch(self, urls: list[str], size: tuple[int, int] = CARD_SIZE) -> None:
+        """Télécharge en parallèle les couvertures absentes du cache."""
+        missing = [url for url in set(urls) if url and not self._path(url, size).exists()]
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda url: self.get(url, size), missing))
+
+    def _store(self, path: Path, data: bytes) -> None:
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        with self._lock:
+            # Une vignette remplacée ne compte qu'une fois
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Supprime les vignettes les moins récemment utilisées (90 % de la limite)."""
+        entries = []
+        for p in self.cache_dir.glob("*.jpg"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in entries:
+            if self._size <= target:
+                break
+            p.unlink(missing_ok=True)
+            self._size -= size
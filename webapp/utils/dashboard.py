@@ -0,0 +1,112 @@
+"""
+Agrégations filtrées du tableau de bord, avec recalcul incrémental.
+Chaque graphique ignore le filtre portant sur son propre champ (comme une
+facette) : modifier un filtre ne recalcule que les agrégations qui en
+dépendent, les autres sont relues depuis le cache.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from utils.es_client import AGGREGATIONS, ESClient
+
+# Champ filtré correspondant à chaque agrégation
+AGG_FIELDS = {
+    "themes": "theme",
+    "editeurs": "editeur",
+    "collections": "collection",
+    "auteurs": "authors",
+    "prix_histogram": "price",
+    "pages_histogram": "pages",
+    "annees": "date_parution",
+}
+
+
+class AggregationCache:
+    """Cache LRU (avec durée de vie) des buckets par agrégation et filtres."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[list[dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, buckets = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return buckets
+
+    def put(self, key: tuple, buckets: list[dict]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), buckets)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def effective_filters(name: str, filters: dict) -> dict:
+    """Filtres qui s'appliquent à une agrégation (tous sauf celui de son champ)."""
+    return {
+        field: values
+        for field, values in filters.items()
+        if values and field != AGG_FIELDS[name]
+    }
+
+
+def load_aggregations(
+    es_client: ESClient,
+    filters: dict,
+    cache: AggregationCache,
+    generation: str = "",
+) -> dict:
+    """
+    Récupère toutes les agrégations du tableau de bord pour des filtres donnés.
+
+    Les agrégations absentes du cache sont regroupées par jeu de filtres
+    effectif : une seule requête Elasticsearch par groupe. Seuls les
+    résultats des requêtes réussies sont mis en cache.
+
+    Args:
+        es_client: Client Elasticsearch
+        filters: Filtres du tableau de bord
+        cache: Cache partagé entre les sessions
+        generation: Version des données (ex: date de l'instantané), pour
+                    ne pas resservir des résultats d'un crawl précédent
+
+    Returns:
+        Dictionnaire au format de ESClient.get_aggregations
+    """
+    result = {}
+    missing = defaultdict(list)
+
+    for name in AGGREGATIONS:
+        frozen = json.dumps(effective_filters(name, filters), sort_keys=True)
+        buckets = cache.get((generation, name, frozen))
+        if buckets is None:
+            missing[frozen].append(name)
+        else:
+            result[name] = buckets
+
+    for frozen, names in missing.items():
+        try:
+            aggs = es_client.get_aggregations(json.loads(frozen), names=names, raise_errors=True)
+        except Exception as e:
+            # Rien en cache : la prochaine exécution retente la requête
+            print(f"Erreur lors de la récupération des agrégations : {e}")
+            for name in names:
+                result[name] = []
+            continue
+        for name in names:
+            result[name] = aggs[name]
+            cache.put((generation, name, frozen), aggs[name])
+
+    return result
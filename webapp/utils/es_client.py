@@ -2,9 +2,136 @@
 Client Elasticsearch pour l'application Streamlit.
 Fournit les méthodes de recherche, récupération et agrégation.
 """
+import json
 import os
-from typing import Optional
-from elasticsearch import Elasticsearch
+import re
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from utils.query_stats import RECORDER
+
+# Sous-champs `completion` utilisés par l'autocomplétion (cf. init_es_index.MAPPING)
+SUGGEST_FIELDS = {
+    "titres": "title.suggest",
+    "auteurs": "authors.suggest",
+    "editeurs": "editeur.suggest",
+}
+
+# Champs affichés par render_ouvrage_card : la liste de résultats ne
+# récupère que ceux-là (la description complète est chargée par la fiche)
+CARD_FIELDS = [
+    "title", "subtitle", "authors", "editeur", "date_parution",
+    "price", "pages", "theme", "image_url",
+]
+
+# Extrait de description renvoyé avec chaque résultat
+DESCRIPTION_HIGHLIGHT = {
+    "pre_tags": ["**"],
+    "post_tags": ["**"],
+    "fields": {
+        "description": {
+            "fragment_size": 200,
+            "number_of_fragments": 1,
+            "no_match_size": 200,
+        },
+    },
+}
+
+# Agrégations des statistiques et des facettes, recopiées dans
+# scripts/build_stats_snapshot.py (contrôle : tests/check_aggregations.py)
+AGGREGATIONS = {
+    "themes": {
+        "terms": {"field": "theme", "size": 10}
+    },
+    "editeurs": {
+        "terms": {"field": "editeur", "size": 20}
+    },
+    "collections": {
+        "terms": {"field": "collection", "size": 30}
+    },
+    "auteurs": {
+        "terms": {"field": "authors", "size": 50}
+    },
+    "prix_histogram": {
+        "histogram": {
+            "field": "price",
+            "interval": 10,
+            "min_doc_count": 1
+        }
+    },
+    "pages_histogram": {
+        "histogram": {
+            "field": "pages",
+            "interval": 100,
+            "min_doc_count": 1
+        }
+    },
+    "annees": {
+        "date_histogram": {
+            "field": "date_parution",
+            "calendar_interval": "year",
+            "format": "yyyy",
+            "min_doc_count": 1
+        }
+    },
+}
+
+# Timeout court : une suggestion en retard ne sert plus à rien
+SUGGEST_TIMEOUT = 1
+
+# Champs de la recherche plein texte
+TEXT_FIELDS = ["title^3", "subtitle^2", "description", "authors"]
+
+# En dessous de ce nombre de résultats, la requête exacte est rejouée en fuzzy
+PLANNER_MIN_HITS = 5
+# Saisies dont le plan retenu est mémorisé (cf. ESClient.search)
+PLAN_MEMORY_SIZE = 512
+
+# Saisie composée uniquement de chiffres, tirets, espaces (et X final)
+ISBN_INPUT = re.compile(r"[\d\s-]+[\dXx]")
+
+
+def normalize_isbn(text: str) -> Optional[str]:
+    """
+    Normalise une saisie ressemblant à un ISBN.
+    
+    Args:
+        text: Saisie de l'utilisateur (ex: "978-2-348-09015-8")
+        
+    Returns:
+        L'ISBN-13 sans séparateurs (un ISBN-10 est converti), ou None si la
+        saisie n'est pas un ISBN
+    """
+    text = text.strip()
+    if not ISBN_INPUT.fullmatch(text):
+        return None
+    digits = re.sub(r"[\s-]", "", text).upper()
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    if len(digits) == 10 and digits[:9].isdigit():
+        # Conversion ISBN-10 -> ISBN-13 : préfixe 978 et nouvelle clé
+        body = "978" + digits[:9]
+        check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body)) % 10) % 10
+        return body + str(check)
+    return None
+
+
+class DocumentStore(OrderedDict):
+    """
+    Documents complets déjà récupérés pour une session, indexés par ID.
+    Les plus anciens sont oubliés au-delà de `max_size` entrées.
+    """
+    
+    def __init__(self, max_size: int = 200):
+        super().__init__()
+        self.max_size = max_size
+    
+    def put(self, doc_id: str, doc: dict) -> None:
+        self[doc_id] = doc
+        self.move_to_end(doc_id)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
 
 
 class ESClient:
@@ -13,7 +140,8 @@ class ESClient:
     def __init__(
         self, 
         host: str = None,
-        index: str = None
+        index: str = None,
+        routing: str = None
     ):
         """
         Initialise le client Elasticsearch.
@@ -21,17 +149,67 @@ class ESClient:
         Args:
             host: URL du serveur Elasticsearch (par défaut depuis .env)
             index: Nom de l'index à utiliser (par défaut depuis .env)
+            routing: Routage des documents de l'index, "doc_id" ou "theme"
+                     (par défaut depuis .env, cf. init_es_index.ES_ROUTING)
         """
         self.host = host or os.getenv("ES_HOST", "http://localhost:9200")
         self.index = index or os.getenv("ES_INDEX", "cairn_ouvrages")
-        self.es = Elasticsearch(self.host)
+        self.routing = routing or os.getenv("ES_ROUTING", "doc_id")
+        self.stats_index = os.getenv("ES_STATS_INDEX", f"{self.index}_stats")
+        self.similar_index = os.getenv("ES_SIMILAR_INDEX", f"{self.index}_similar")
+        self.runs_index = os.getenv("ES_RUNS_INDEX", f"{self.index}_runs")
+        self._es = None
+        # (saisie, filtres) -> plan retenu, réutilisé pour les pages suivantes
+        self._plan_memory = OrderedDict()
+    
+    @property
+    def es(self):
+        """
+        Client Elasticsearch sous-jacent, créé (et le module importé) au
+        premier appel : les pages qui n'interrogent pas ES n'en paient pas
+        le coût.
+        """
+        if self._es is None:
+            from elasticsearch import Elasticsearch
+            self._es = Elasticsearch(self.host)
+        return self._es
+    
+    def _request(self, method: str, call, **kwargs):
+        """
+        Exécute un appel Elasticsearch et l'enregistre dans RECORDER
+        (durée, took, taille de réponse, nombre de résultats).
         
+        Args:
+            method: Méthode de ESClient à l'origine de l'appel
+            call: Méthode du client Elasticsearch à appeler
+            **kwargs: Arguments de l'appel
+        """
+        start = time.perf_counter()
+        response = call(**kwargs)
+        RECORDER.record(method, (time.perf_counter() - start) * 1000, response, kwargs.get("body"))
+        return response
+    
+    def _route(self, filters: Optional[dict]) -> dict:
+        """
+        Paramètre `routing` d'une requête filtrée par thème, quand l'index
+        est routé par thème : seuls les shards de ces thèmes sont interrogés.
+        
+        Returns:
+            {"routing": "thème1,thème2"} ou {} (tous les shards)
+        """
+        themes = (filters or {}).get("theme")
+        if self.routing == "theme" and isinstance(themes, list) and themes:
+            return {"routing": ",".join(themes)}
+        return {}
+    
     def search(
         self,
         query: str = "",
         filters: Optional[dict[str, list[str]]] = None,
         page: int = 1,
         size: int = 20,
+        source_fields: Optional[list[str]] = CARD_FIELDS,
+        doc_store: Optional[DocumentStore] = None,
     ) -> dict:
         """
         Recherche des ouvrages avec filtres et pagination.
@@ -40,63 +218,285 @@ class ESClient:
             query: Texte de recherche (titre, description, auteurs)
             filters: Dictionnaire de filtres par facettes
                      ex: {"theme": ["SHS"], "editeur": ["PUF"]}
+                     ou par intervalle, ex: {"price": {"gte": 10, "lte": 30}}
             page: Numéro de page (commence à 1)
             size: Nombre de résultats par page
+            source_fields: Champs du `_source` à renvoyer (None = document
+                           complet). Par défaut, ceux affichés sur une carte.
+            doc_store: Si fourni, reçoit les documents complets de la page
+                       (via un `mget` groupé quand `source_fields` est
+                       défini) pour que la fiche s'ouvre sans requête
             
         Returns:
-            Dictionnaire avec 'total' et 'hits' (liste de documents)
+            Dictionnaire avec 'total', 'hits' (liste de documents) et 'plan'
+            (stratégie retenue, cf. _plans). Chaque hit porte un extrait de
+            description dans hit["highlight"].
         """
         # Calcul de l'offset pour la pagination
         from_offset = (page - 1) * size
+        filter_clauses = self._filter_clauses(filters)
         
-        # Construction de la query
-        must_clauses = []
-        filter_clauses = []
+        def search_body(clause: dict) -> dict:
+            body = {
+                "from": from_offset,
+                "size": size,
+                "query": {"bool": {"must": [clause], "filter": filter_clauses}},
+                "sort": [
+                    {"_score": {"order": "desc"}},
+                    {"date_parution": {"order": "desc"}}
+                ],
+                "highlight": DESCRIPTION_HIGHLIGHT,
+            }
+            if source_fields is not None:
+                body["_source"] = source_fields
+            return body
+        
+        # Le plan retenu pour une saisie et des filtres ne dépend pas de la
+        # page : les pages suivantes ne rejouent que celui-là
+        plans = self._plans(query)
+        memory_key = (query.strip(), json.dumps(filters or {}, sort_keys=True, default=str))
+        remembered = self._plan_memory.get(memory_key)
+        plans = [p for p in plans if p[0] == remembered] or plans
+        
+        # Le premier plan qui renvoie assez de résultats est retenu, le
+        # dernier l'est toujours. Les plans peu coûteux partent ensemble
+        # (msearch) ; le fuzzy n'est envoyé que s'ils ne suffisent pas.
+        cheap = [p for p in plans if p[0] != "fuzzy"]
+        fallback = [p for p in plans if p[0] == "fuzzy"]
+        try:
+            plan = response = None
+            responses = self._run_plans(cheap, search_body, filters) if cheap else []
+            for (name, _, min_hits), candidate in zip(cheap, responses):
+                if candidate["hits"]["total"]["value"] >= min_hits:
+                    plan, response = name, candidate
+                    break
+            if plan is None and fallback:
+                plan, response = fallback[0][0], self._run_plans(fallback, search_body, filters)[0]
+            elif plan is None:
+                plan, response = cheap[-1][0], responses[-1]
+            hits = response["hits"]["hits"]
+        except Exception as e:
+            print(f"Erreur lors de la recherche : {e}")
+            return {"total": 0, "hits": [], "plan": None}
+        
+        self._plan_memory[memory_key] = plan
+        self._plan_memory.move_to_end(memory_key)
+        while len(self._plan_memory) > PLAN_MEMORY_SIZE:
+            self._plan_memory.popitem(last=False)
+        
+        if doc_store is not None:
+            # Documents complets et ouvrages similaires de la page en une
+            # seule requête : la fiche s'ouvre sans aller-retour
+            pending = [hit["_id"] for hit in hits if "_similar" not in doc_store.get(hit["_id"], {})]
+            if source_fields is None:
+                found = self._multi_get(pending, [self.similar_index])
+                sources = {hit["_id"]: hit["_source"] for hit in hits}
+            else:
+                found = self._multi_get(pending, [self.index, self.similar_index])
+                sources = found[self.index]
+            for doc_id in pending:
+                if doc_id in sources:
+                    similar = found[self.similar_index].get(doc_id, {}).get("similar", [])
+                    doc_store.put(doc_id, {**sources[doc_id], "_similar": similar})
+        
+        return {
+            "total": response["hits"]["total"]["value"],
+            "hits": hits,
+            "plan": plan,
+        }
+    
+    def _run_plans(self, plans: list[tuple[str, dict, int]], search_body, filters: Optional[dict]) -> list[dict]:
+        """Réponses des plans donnés : un `search`, ou un seul `msearch` pour plusieurs."""
+        if len(plans) == 1:
+            name, clause, _ = plans[0]
+            return [self._request(
+                f"search[{name}]", self.es.search,
+                index=self.index, body=search_body(clause), **self._route(filters),
+            )]
+        header = {"index": self.index, **self._route(filters)}
+        searches = []
+        for _, clause, _ in plans:
+            searches.extend([header, search_body(clause)])
+        responses = self._request(
+            f"search[{'+'.join(name for name, _, _ in plans)}]", self.es.msearch, searches=searches,
+        )["responses"]
+        for response in responses:
+            if "error" in response:
+                raise RuntimeError(response["error"])
+        return responses
+    
+    def iter_batches(
+        self,
+        query: str = "",
+        filters: Optional[dict] = None,
+        batch_size: int = 1000,
+        keep_alive: str = "2m",
+        plan: Optional[str] = None,
+    ) -> Iterator[list[dict]]:
+        """
+        Parcourt tous les résultats d'une recherche, lot par lot.
+        
+        S'appuie sur un point-in-time et `search_after` (tri `_shard_doc`) :
+        la vue de l'index reste cohérente pendant tout le parcours, et seul
+        le lot courant est en mémoire, quel que soit le nombre de résultats.
+        
+        Args:
+            query: Texte de recherche (même sémantique que search)
+            filters: Filtres (même format que search)
+            batch_size: Nombre de documents par lot
+            keep_alive: Durée de vie du point-in-time entre deux lots
+            plan: Plan retenu par search (results["plan"]) pour exporter
+                  exactement les mêmes résultats ; par défaut, le plus large
+            
+        Yields:
+            Listes de documents (`_source`)
+        """
+        pit_id = self._request(
+            "iter_batches", self.es.open_point_in_time,
+            index=self.index, keep_alive=keep_alive, **self._route(filters),
+        )["id"]
+        search_after = None
+        try:
+            while True:
+                body = {
+                    "size": batch_size,
+                    "query": self._build_query(query, filters, plan),
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "sort": [{"_shard_doc": "asc"}],
+                    "track_total_hits": False,
+                }
+                if search_after is not None:
+                    body["search_after"] = search_after
+                response = self._request("iter_batches", self.es.search, body=body)
+                
+                hits = response["hits"]["hits"]
+                if not hits:
+                    return
+                pit_id = response.get("pit_id", pit_id)
+                search_after = hits[-1]["sort"]
+                yield [hit["_source"] for hit in hits]
+        finally:
+            try:
+                self.es.close_point_in_time(id=pit_id)
+            except Exception as e:
+                print(f"Erreur lors de la fermeture du point-in-time : {e}")
+    
+    @classmethod
+    def _plans(cls, query: str) -> list[tuple[str, dict, int]]:
+        """
+        Plans d'exécution candidats pour une saisie, du plus sélectif au plus
+        large : (nom, clause texte, nombre minimal de résultats pour le retenir).
+        
+        - "isbn" : `term` sur l'ISBN normalisé
+        - "keyword" : nom exact d'auteur ou d'éditeur (`term` insensible à la casse)
+        - "prefix" : saisie trop courte pour le fuzzy, recherche par préfixe
+        - "exact" : multi_match sans fuzziness
+        - "fuzzy" : multi_match avec fuzziness AUTO, en dernier recours
+        """
+        query = query.strip()
+        if not query:
+            return [("match_all", {"match_all": {}}, 0)]
         
-        # Recherche textuelle si une query est fournie
-        if query:
-            must_clauses.append({
+        plans = []
+        isbn = normalize_isbn(query)
+        if isbn:
+            plans.append(("isbn", {"term": {"isbn.normalized": isbn}}, 1))
+        if len(query) <= 2:
+            plans.append(("prefix", {
                 "multi_match": {
                     "query": query,
-                    "fields": ["title^3", "subtitle^2", "description", "authors"],
-                    "type": "best_fields",
-                    "fuzziness": "AUTO"
+                    "fields": ["title", "subtitle"],
+                    "type": "bool_prefix",
                 }
-            })
+            }, 0))
+            return plans
+        if not any(char.isdigit() for char in query) and len(query.split()) <= 5:
+            plans.append(("keyword", {
+                "bool": {
+                    "should": [
+                        {"term": {field: {"value": query, "case_insensitive": True}}}
+                        for field in ("authors", "editeur")
+                    ],
+                    "minimum_should_match": 1,
+                }
+            }, 1))
+        plans.append(("exact", {
+            "multi_match": {"query": query, "fields": TEXT_FIELDS, "type": "best_fields"}
+        }, PLANNER_MIN_HITS))
+        plans.append(("fuzzy", {
+            "multi_match": {
+                "query": query,
+                "fields": TEXT_FIELDS,
+                "type": "best_fields",
+                "fuzziness": "AUTO"
+            }
+        }, 0))
+        return plans
+    
+    @classmethod
+    def _build_query(cls, query: str, filters: Optional[dict], plan: Optional[str] = None) -> dict:
+        """Construit la query `bool` : clause du plan demandé (le dernier par défaut) + filtres."""
+        plans = {name: clause for name, clause, _ in cls._plans(query)}
+        clause = plans.get(plan) or list(plans.values())[-1]
+        return {
+            "bool": {
+                "must": [clause],
+                "filter": cls._filter_clauses(filters)
+            }
+        }
+    
+    def suggest(self, prefix: str, size: int = 5) -> dict[str, list[str]]:
+        """
+        Suggestions d'autocomplétion pour les titres, auteurs et éditeurs.
         
-        # Ajout des filtres par facettes
-        if filters:
-            for field, values in filters.items():
-                if values:  # Seulement si la liste n'est pas vide
-                    filter_clauses.append({
-                        "terms": {field: values}
-                    })
+        Interroge les sous-champs `completion` (FST chargé en mémoire), sans
+        récupérer de `_source` : la requête est assez légère pour être
+        envoyée à chaque frappe.
+        
+        Args:
+            prefix: Début de saisie de l'utilisateur
+            size: Nombre maximal de suggestions par catégorie
+            
+        Returns:
+            Dictionnaire avec 'titres', 'auteurs' et 'editeurs' (listes de chaînes)
+        """
+        suggestions = {name: [] for name in SUGGEST_FIELDS}
+        
+        # Inutile d'interroger ES pour un préfixe trop court
+        prefix = prefix.strip()
+        if len(prefix) < 2:
+            return suggestions
         
-        # Construction du body de la requête
         body = {
-            "from": from_offset,
-            "size": size,
-            "query": {
-                "bool": {
-                    "must": must_clauses if must_clauses else [{"match_all": {}}],
-                    "filter": filter_clauses
+            "size": 0,
+            "_source": False,
+            "suggest": {
+                name: {
+                    "prefix": prefix,
+                    "completion": {
+                        "field": field,
+                        "size": size,
+                        "skip_duplicates": True,
+                    },
                 }
+                for name, field in SUGGEST_FIELDS.items()
             },
-            "sort": [
-                {"_score": {"order": "desc"}},
-                {"date_parution": {"order": "desc"}}
-            ]
         }
         
         try:
-            response = self.es.search(index=self.index, body=body)
-            return {
-                "total": response["hits"]["total"]["value"],
-                "hits": response["hits"]["hits"]
-            }
+            response = self._request(
+                "suggest",
+                self.es.options(request_timeout=SUGGEST_TIMEOUT).search,
+                index=self.index,
+                body=body,
+            )
+            for name in SUGGEST_FIELDS:
+                for entry in response["suggest"][name]:
+                    suggestions[name].extend(opt["text"] for opt in entry["options"])
+            return suggestions
         except Exception as e:
-            print(f"Erreur lors de la recherche : {e}")
-            return {"total": 0, "hits": []}
+            print(f"Erreur lors de l'autocomplétion : {e}")
+            return suggestions
     
     def get_by_id(self, doc_id: str) -> Optional[dict]:
         """
@@ -108,22 +508,98 @@ class ESClient:
         Returns:
             Document complet ou None si non trouvé
         """
+        if self.routing == "theme":
+            # Routage par thème : l'ID seul ne désigne plus un shard
+            return self.get_many([doc_id]).get(doc_id)
         try:
-            response = self.es.get(index=self.index, id=doc_id)
+            response = self._request("get_by_id", self.es.get, index=self.index, id=doc_id)
             return response["_source"]
         except Exception as e:
             print(f"Erreur lors de la récupération du document {doc_id} : {e}")
             return None
     
+    def get_similar(self, doc_id: str) -> list[dict]:
+        """
+        Récupère les ouvrages similaires, précalculés par
+        scripts/build_similar_books.py.
+        
+        Args:
+            doc_id: Identifiant de l'ouvrage
+            
+        Returns:
+            Liste de {doc_id, title, authors, url, score}, du plus proche au
+            moins proche (vide si rien n'a été précalculé)
+        """
+        try:
+            response = self._request("get_similar", self.es.get, index=self.similar_index, id=doc_id)
+            return response["_source"]["similar"]
+        except Exception as e:
+            print(f"Aucun ouvrage similaire pour {doc_id} : {e}")
+            return []
+    
+    def get_many(self, doc_ids: list[str]) -> dict[str, dict]:
+        """
+        Récupère plusieurs ouvrages en une seule requête (`mget`, ou une
+        requête `ids` sur tous les shards si l'index est routé par thème).
+        
+        Args:
+            doc_ids: Identifiants des documents
+            
+        Returns:
+            Dictionnaire {doc_id: document} des documents trouvés
+        """
+        return self._multi_get(doc_ids, [self.index])[self.index]
+    
+    def _multi_get(self, doc_ids: list[str], indexes: list[str]) -> dict[str, dict[str, dict]]:
+        """
+        Récupère les documents `doc_ids` de plusieurs index en une requête
+        (`mget`, ou une requête `ids` sur tous les shards si l'index est
+        routé par thème ; l'index des similaires n'est jamais routé).
+        
+        Returns:
+            Dictionnaire {index: {doc_id: document}} des documents trouvés
+        """
+        found = {index: {} for index in indexes}
+        if not doc_ids:
+            return found
+        try:
+            if self.routing == "theme":
+                response = self._request(
+                    "get_many", self.es.search, index=",".join(indexes),
+                    body={"size": len(doc_ids) * len(indexes), "query": {"ids": {"values": doc_ids}}},
+                    ignore_unavailable=True,
+                )
+                for hit in response["hits"]["hits"]:
+                    # L'index principal peut être un alias : _index est alors son index réel
+                    index = hit["_index"] if hit["_index"] in found else self.index
+                    found[index][hit["_id"]] = hit["_source"]
+                return found
+            docs = [{"_index": index, "_id": doc_id} for index in indexes for doc_id in doc_ids]
+            response = self._request("get_many", self.es.mget, docs=docs)
+            for requested, doc in zip(docs, response["docs"]):
+                if doc.get("found"):
+                    found[requested["_index"]][doc["_id"]] = doc["_source"]
+            return found
+        except Exception as e:
+            print(f"Erreur lors de la récupération groupée des documents : {e}")
+            return found
+    
     def get_aggregations(
         self,
         filters: Optional[dict[str, list[str]]] = None,
+        names: Optional[list[str]] = None,
+        raise_errors: bool = False,
     ) -> dict:
         """
         Récupère les agrégations pour les statistiques et facettes.
         
         Args:
             filters: Filtres à appliquer avant agrégation
+            names: Agrégations à calculer (par défaut toutes celles de
+                   AGGREGATIONS) ; les autres sont renvoyées vides
+            raise_errors: Propager les erreurs Elasticsearch au lieu de
+                          renvoyer des buckets vides (pour ne pas mettre
+                          un échec en cache)
             
         Returns:
             Dictionnaire avec les buckets pour chaque agrégation :
@@ -135,96 +611,216 @@ class ESClient:
             - pages_histogram: liste de {key, doc_count}
             - annees: liste de {key, doc_count}
         """
-        # Construction des filtres
-        filter_clauses = []
-        if filters:
-            for field, values in filters.items():
-                if values:
-                    filter_clauses.append({
-                        "terms": {field: values}
-                    })
+        names = list(AGGREGATIONS) if names is None else names
+        result = {name: [] for name in AGGREGATIONS}
         
-        # Body de la requête avec toutes les agrégations
+        # Body de la requête avec les agrégations demandées
         body = {
             "size": 0,  # On ne veut que les agrégations, pas les documents
-            "query": {
-                "bool": {
-                    "filter": filter_clauses
-                }
-            } if filter_clauses else {"match_all": {}},
-            "aggs": {
-                "themes": {
-                    "terms": {"field": "theme", "size": 10}
-                },
-                "editeurs": {
-                    "terms": {"field": "editeur", "size": 20}
-                },
-                "collections": {
-                    "terms": {"field": "collection", "size": 30}
-                },
-                "auteurs": {
-                    "terms": {"field": "authors", "size": 50}
-                },
-                "prix_histogram": {
-                    "histogram": {
-                        "field": "price",
-                        "interval": 10,
-                        "min_doc_count": 1
-                    }
-                },
-                "pages_histogram": {
-                    "histogram": {
-                        "field": "pages",
-                        "interval": 100,
-                        "min_doc_count": 1
-                    }
-                },
-                "annees": {
-                    "date_histogram": {
-                        "field": "date_parution",
-                        "calendar_interval": "year",
-                        "format": "yyyy",
-                        "min_doc_count": 1
-                    }
-                }
-            }
+            "query": self._filter_query(filters),
+            "aggs": {name: AGGREGATIONS[name] for name in names},
         }
         
         try:
-            response = self.es.search(index=self.index, body=body)
+            response = self._request(
+                "get_aggregations", self.es.search,
+                index=self.index, body=body, **self._route(filters),
+            )
             aggs = response["aggregations"]
-            
-            return {
-                "themes": aggs["themes"]["buckets"],
-                "editeurs": aggs["editeurs"]["buckets"],
-                "collections": aggs["collections"]["buckets"],
-                "auteurs": aggs["auteurs"]["buckets"],
-                "prix_histogram": aggs["prix_histogram"]["buckets"],
-                "pages_histogram": aggs["pages_histogram"]["buckets"],
-                "annees": aggs["annees"]["buckets"],
-            }
+            for name in names:
+                result[name] = aggs[name]["buckets"]
+            return result
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Erreur lors de la récupération des agrégations : {e}")
-            return {
-                "themes": [],
-                "editeurs": [],
-                "collections": [],
-                "auteurs": [],
-                "prix_histogram": [],
-                "pages_histogram": [],
-                "annees": [],
+            return result
+    
+    def get_facet_page(
+        self,
+        field: str,
+        filters: Optional[dict[str, list[str]]] = None,
+        prefix: str = "",
+        after: Optional[dict] = None,
+        size: int = 20,
+    ) -> dict:
+        """
+        Parcourt les valeurs d'une facette page par page (agrégation
+        `composite`), triées par ordre alphabétique.
+        
+        Contrairement à un `terms`, la réponse est bornée par la taille de la
+        page et n'importe quel auteur reste atteignable parmi des dizaines de
+        milliers. Chaque page parcourt en revanche tous les documents qui
+        correspondent aux filtres : le préfixe réduit ce parcours.
+        
+        Args:
+            field: Champ keyword de la facette (ex: "authors", "collection")
+            filters: Filtres des autres facettes
+            prefix: Ne garder que les valeurs commençant par ce préfixe
+                    (insensible à la casse)
+            after: Clé de reprise renvoyée par l'appel précédent
+            size: Nombre de valeurs par page
+            
+        Returns:
+            Dictionnaire avec 'buckets' (liste de {key, doc_count}) et
+            'after_key' (None quand la facette est épuisée)
+        """
+        prefix = prefix.strip()
+        query = self._filter_query(filters)
+        if prefix:
+            query = {
+                "bool": {
+                    "filter": [
+                        query,
+                        {"prefix": {field: {"value": prefix, "case_insensitive": True}}},
+                    ]
+                }
             }
+        
+        buckets = []
+        try:
+            # Sur un champ multi-valué (authors), le préfixe filtre les
+            # documents mais pas leurs autres valeurs : on les écarte ici et
+            # on continue tant que la page n'est pas remplie
+            while len(buckets) < size:
+                composite = {
+                    "size": size,
+                    "sources": [{"key": {"terms": {"field": field}}}],
+                }
+                if after:
+                    composite["after"] = after
+                body = {
+                    "size": 0,
+                    "query": query,
+                    "aggs": {"facet": {"composite": composite}},
+                }
+                response = self._request(
+                    "get_facet_page", self.es.search,
+                    index=self.index, body=body, **self._route(filters),
+                )
+                facet = response["aggregations"]["facet"]
+                
+                exhausted = facet.get("after_key") is None or len(facet["buckets"]) < size
+                for position, bucket in enumerate(facet["buckets"], 1):
+                    key = bucket["key"]["key"]
+                    if key.lower().startswith(prefix.lower()):
+                        buckets.append({"key": key, "doc_count": bucket["doc_count"]})
+                        if len(buckets) == size:
+                            break
+                
+                if len(buckets) == size:
+                    # Page pleine : la suite reprend après la dernière valeur gardée
+                    last = exhausted and position == len(facet["buckets"])
+                    after = None if last else {"key": buckets[-1]["key"]}
+                    break
+                after = facet.get("after_key")
+                if exhausted:
+                    after = None
+                    break
+            return {"buckets": buckets, "after_key": after}
+        except Exception as e:
+            print(f"Erreur lors du parcours de la facette {field} : {e}")
+            return {"buckets": buckets, "after_key": None}
+    
+    @staticmethod
+    def _filter_clauses(filters: Optional[dict]) -> list[dict]:
+        """
+        Convertit les filtres en clauses Elasticsearch : une liste de
+        valeurs donne un `terms`, un dictionnaire (ex: {"gte": 10, "lte": 30})
+        donne un `range`.
+        """
+        filter_clauses = []
+        if filters:
+            for field, values in filters.items():
+                if not values:  # Seulement si le filtre n'est pas vide
+                    continue
+                if isinstance(values, dict):
+                    filter_clauses.append({
+                        "range": {field: values}
+                    })
+                else:
+                    filter_clauses.append({
+                        "terms": {field: values}
+                    })
+        return filter_clauses
+    
+    @classmethod
+    def _filter_query(cls, filters: Optional[dict]) -> dict:
+        """Construit la query `bool/filter` correspondant aux filtres."""
+        filter_clauses = cls._filter_clauses(filters)
+        if not filter_clauses:
+            return {"match_all": {}}
+        return {"bool": {"filter": filter_clauses}}
+    
+    def get_stats_snapshot(self) -> Optional[dict]:
+        """
+        Récupère le dernier instantané des statistiques, calculé après le
+        crawl par scripts/build_stats_snapshot.py.
+        
+        Returns:
+            Dictionnaire avec 'created_at', 'total' et 'aggregations' (même
+            format que get_aggregations) ou None si aucun instantané
+        """
+        try:
+            response = self._request("get_stats_snapshot", self.es.get, index=self.stats_index, id="latest")
+            return response["_source"]
+        except Exception as e:
+            print(f"Aucun instantané de statistiques disponible : {e}")
+            return None
     
-    def get_count(self) -> int:
+    def get_crawl_runs(self, size: int = 200) -> list[dict]:
         """
-        Retourne le nombre total de documents dans l'index.
+        Récupère les résumés des derniers crawls, publiés après chaque crawl
+        par scripts/publish_crawl_runs.py.
         
+        Args:
+            size: Nombre maximal de crawls renvoyés
+            
         Returns:
-            Nombre total d'ouvrages
+            Liste de crawls (run_id, started_at, duration_s, items, complete, themes :
+            {thème: {items, added, price_changed, removed, catalogue,
+            duration_s}}), du plus ancien au plus récent
         """
+        body = {"size": size, "sort": [{"started_at": {"order": "desc"}}]}
         try:
-            response = self.es.count(index=self.index)
+            response = self._request("get_crawl_runs", self.es.search, index=self.runs_index, body=body)
+            return [hit["_source"] for hit in reversed(response["hits"]["hits"])]
+        except Exception as e:
+            print(f"Aucun historique de crawl disponible : {e}")
+            return []
+    
+    def get_count(self, filters: Optional[dict] = None) -> int:
+        """
+        Retourne le nombre de documents dans l'index.
+        
+        Args:
+            filters: Filtres à appliquer (par défaut, tout l'index)
+            
+        Returns:
+            Nombre d'ouvrages correspondant aux filtres
+        """
+        try:
+            if filters:
+                response = self._request(
+                    "get_count", self.es.count,
+                    index=self.index, body={"query": self._filter_query(filters)},
+                    **self._route(filters),
+                )
+            else:
+                response = self._request("get_count", self.es.count, index=self.index)
             return response["count"]
         except Exception as e:
             print(f"Erreur lors du comptage : {e}")
             return 0
+
+
+def create_client():
+    """
+    Crée le client de recherche choisi par SEARCH_BACKEND :
+    "elasticsearch" (par défaut) ou "memory" pour le moteur embarqué
+    (cf. utils/memory_client.py).
+    """
+    if os.getenv("SEARCH_BACKEND", "elasticsearch") == "memory":
+        from utils.memory_client import load_memory_client
+        return load_memory_client()
+    return ESClient()
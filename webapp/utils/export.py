@@ -0,0 +1,183 @@
+"""
+Export des résultats de recherche en CSV, JSON Lines ou Parquet.
+Les documents sont écrits lot par lot au fil du parcours (ESClient.iter_batches) :
+la mémoire utilisée ne dépend pas du nombre de résultats.
+
+Les fichiers sont écrits dans webapp/static/exports et servis par le serveur
+statique de Streamlit, qui les lit sur disque par morceaux : ils ne passent
+ni par la mémoire du serveur ni par son media store. Chaque fichier est
+supprimé quand la session qui l'a créé disparaît, ou après EXPORT_TTL.
+"""
+import csv
+import io
+import json
+import time
+import uuid
+import weakref
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+from utils.es_client import ESClient
+
+EXPORT_DIR = Path(__file__).parent.parent / "static" / "exports"
+EXPORT_URL = "app/static/exports"
+EXPORT_TTL = 3600  # secondes
+# Sans service statique, taille maximale envoyée par st.download_button
+INLINE_MAX_BYTES = 50 * 1024 * 1024
+
+# Colonnes exportées, dans l'ordre
+EXPORT_FIELDS = [
+    "doc_id", "title", "subtitle", "authors", "editeur", "collection",
+    "date_parution", "date_mise_en_ligne", "pages", "price", "isbn",
+    "theme", "url", "image_url", "description",
+]
+
+
+def write_csv(batches: Iterable[list[dict]], fileobj: BinaryIO) -> int:
+    """Écrit les documents en CSV (auteurs séparés par « ; »)."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+    writer = csv.DictWriter(text, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for batch in batches:
+        for doc in batch:
+            row = dict(doc)
+            row["authors"] = "; ".join(doc.get("authors") or [])
+            writer.writerow(row)
+        count += len(batch)
+    text.flush()
+    text.detach()  # rend la main sur fileobj sans le fermer
+    return count
+
+
+def write_ndjson(batches: Iterable[list[dict]], fileobj: BinaryIO) -> int:
+    """Écrit un document JSON par ligne."""
+    count = 0
+    for batch in batches:
+        for doc in batch:
+            row = {field: doc.get(field) for field in EXPORT_FIELDS}
+            fileobj.write(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+            fileobj.write(b"\n")
+        count += len(batch)
+    return count
+
+
+def write_parquet(batches: Iterable[list[dict]], fileobj: BinaryIO) -> int:
+    """Écrit les documents en Parquet, un row group par lot."""
+    # pyarrow est une dépendance de Streamlit, importée seulement ici
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("doc_id", pa.string()),
+        ("title", pa.string()),
+        ("subtitle", pa.string()),
+        ("authors", pa.list_(pa.string())),
+        ("editeur", pa.string()),
+        ("collection", pa.string()),
+        ("date_parution", pa.string()),
+        ("date_mise_en_ligne", pa.string()),
+        ("pages", pa.int32()),
+        ("price", pa.float64()),
+        ("isbn", pa.string()),
+        ("theme", pa.string()),
+        ("url", pa.string()),
+        ("image_url", pa.string()),
+        ("description", pa.string()),
+    ])
+
+    count = 0
+    with pq.ParquetWriter(fileobj, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+# Format -> (extension, type MIME, fonction d'écriture)
+FORMATS = {
+    "CSV": ("csv", "text/csv", write_csv),
+    "JSON Lines": ("ndjson", "application/x-ndjson", write_ndjson),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", write_parquet),
+}
+
+
+def export_results(
+    es_client: ESClient,
+    fileobj: BinaryIO,
+    fmt: str,
+    query: str = "",
+    filters: dict = None,
+    batch_size: int = 1000,
+    plan: str = None,
+) -> int:
+    """
+    Exporte tous les résultats d'une recherche dans un fichier.
+
+    Args:
+        es_client: Client Elasticsearch
+        fileobj: Fichier binaire de destination
+        fmt: Format d'export (clé de FORMATS)
+        query: Texte de recherche
+        filters: Filtres par facettes
+        batch_size: Nombre de documents lus par requête
+        plan: Plan retenu par la recherche affichée (cf. ESClient.search)
+
+    Returns:
+        Nombre de documents exportés
+    """
+    _, _, write = FORMATS[fmt]
+    batches = es_client.iter_batches(
+        query=query, filters=filters, batch_size=batch_size, plan=plan
+    )
+    return write(batches, fileobj)
+
+
+def _unlink(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+class ExportFile:
+    """
+    Fichier d'export d'une session, conservé dans st.session_state.
+
+    Le fichier est supprimé par delete(), ou automatiquement quand l'objet
+    est libéré avec l'état de la session expirée (ainsi qu'à l'arrêt).
+    """
+
+    def __init__(self, extension: str, key: tuple):
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        # Nom aléatoire : l'URL n'est devinable que par la session qui l'a reçue
+        self.path = EXPORT_DIR / f"{uuid.uuid4().hex}.{extension}"
+        self.key = key
+        self.count = 0
+        self._finalizer = weakref.finalize(self, _unlink, self.path)
+
+    @property
+    def url(self) -> str:
+        return f"{EXPORT_URL}/{self.path.name}"
+
+    def delete(self) -> None:
+        self._finalizer()
+
+
+def sweep_exports(max_age: float = EXPORT_TTL) -> int:
+    """
+    Supprime les exports plus anciens que max_age (sessions perdues sans
+    finalisation, redémarrage du serveur).
+
+    Returns:
+        Nombre de fichiers supprimés
+    """
+    if not EXPORT_DIR.exists():
+        return 0
+    deadline = time.time() - max_age
+    removed = 0
+    for path in EXPORT_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < deadline:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,568 @@
+"""
+Moteur de recherche embarqué, sans Elasticsearch.
+Pour les petites installations, les démos et les tests : le catalogue
+(fixtures.json ou MongoDB) est chargé en mémoire dans un index inversé
+compact, avec des colonnes encodées par dictionnaire pour les facettes.
+MemoryClient expose les mêmes méthodes que ESClient et renvoie les mêmes
+structures, les pages Streamlit n'y voient aucune différence.
+"""
+import bisect
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, Optional
+
+from utils.es_client import AGGREGATIONS, CARD_FIELDS, PLANNER_MIN_HITS, DocumentStore, SUGGEST_FIELDS
+
+DEFAULT_FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures.json"
+
+# Mêmes champs et boosts que le multi_match de ESClient
+TEXT_FIELDS = {"title": 3.0, "subtitle": 2.0, "description": 1.0}
+KEYWORD_FIELDS = ["theme", "editeur", "collection", "authors", "isbn"]
+NUMERIC_FIELDS = ["price", "pages"]
+DATE_FIELDS = ["date_parution", "date_mise_en_ligne"]
+
+# BM25, paramètres par défaut d'Elasticsearch
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_SIZE = 200
+# Expansions floues mémorisées par instance (cf. MemoryClient._expand)
+EXPANSION_CACHE_SIZE = 4096
+
+STOPWORDS = frozenset("""
+    a au aux avec ce ces cet cette dans de des du elle elles en et eux il ils
+    je la le les leur leurs lui ma mais me meme mes moi mon ne ni nos notre
+    nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu
+    un une vos votre vous y est sont ete etre avoir ont a sans sous entre
+    plus comme tout tous toute toutes aussi ainsi dont
+""".split())
+
+ELISION = re.compile(r"\b(?:l|d|j|m|n|s|t|c|qu|jusqu|lorsqu|puisqu)'")
+WORD = re.compile(r"[a-z0-9]+")
+
+# Suffixes retirés par le racinisateur léger (du plus long au plus court)
+SUFFIXES = (
+    "issements", "issement", "ements", "ement", "ations", "ation", "atrices",
+    "atrice", "ateurs", "ateur", "ismes", "isme", "istes", "iste", "iques",
+    "ique", "ites", "ite", "euses", "euse", "eurs", "eur", "ables", "able",
+    "ances", "ance", "ences", "ence", "ments", "ment", "elles", "elle",
+)
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents, apostrophes typographiques normalisées."""
+    text = unicodedata.normalize("NFKD", text.replace("’", "'"))
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Racinisation légère du français (suffixes courants, pluriels)."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    if token.endswith("aux") and len(token) > 4:
+        return token[:-3] + "al"
+    if token[-1] in "sx":
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Découpe un texte français en termes indexables."""
+    text = ELISION.sub(" ", fold(text or ""))
+    return [stem(t) for t in WORD.findall(text) if t not in STOPWORDS]
+
+
+def max_edits(term: str) -> int:
+    """Équivalent de `fuzziness: AUTO`."""
+    if len(term) <= 2:
+        return 0
+    return 1 if len(term) <= 5 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Distance de Levenshtein, abandonnée dès qu'elle dépasse `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def parse_date(value) -> Optional[int]:
+    """Date au format dd/MM/yyyy, yyyy-MM-dd ou yyyy -> epoch en millisecondes."""
+    if not value:
+        return None
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%Y"):
+        try:
+            parsed = datetime.strptime(str(value), fmt).replace(tzinfo=timezone.utc)
+            return int(parsed.timestamp() * 1000)
+        except ValueError:
+            continue
+    return None
+
+
+DAY_MS = 24 * 3600 * 1000
+
+
+def year_start(year: int) -> int:
+    return int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class MemoryClient:
+    """Client de recherche en mémoire, compatible avec ESClient."""
+
+    def __init__(self, docs: list[dict]):
+        """
+        Construit l'index en mémoire.
+
+        Args:
+            docs: Documents au format de l'index Elasticsearch
+        """
+        self.docs = docs
+        self.ids = [doc["doc_id"] for doc in docs]
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.index = "memory"
+        n = len(docs)
+
+        # Index inversé par champ texte : terme -> {doc: tf}
+        self.postings = {field: defaultdict(dict) for field in TEXT_FIELDS}
+        self.lengths = {field: [0] * n for field in TEXT_FIELDS}
+        for i, doc in enumerate(docs):
+            for field in TEXT_FIELDS:
+                terms = tokenize(doc.get(field) or "")
+                self.lengths[field][i] = len(terms)
+                for term, tf in Counter(terms).items():
+                    self.postings[field][term][i] = tf
+        self.avg_lengths = {
+            field: (sum(lengths) / n if n else 0) or 1
+            for field, lengths in self.lengths.items()
+        }
+
+        # Vocabulaire regroupé par (première lettre, longueur) pour le flou
+        self.vocabulary = defaultdict(set)
+        for field in TEXT_FIELDS:
+            for term in self.postings[field]:
+                self.vocabulary[(term[0], len(term))].add(term)
+        self._expansions = {}
+
+        # Colonnes keyword encodées par dictionnaire : valeur -> code, et
+        # pour chaque document la liste de ses codes
+        self.keyword_values = {}
+        self.keyword_codes = {}
+        self.keyword_postings = {}
+        for field in KEYWORD_FIELDS:
+            values, codes = {}, []
+            postings = defaultdict(set)
+            for i, doc in enumerate(docs):
+                raw = doc.get(field)
+                raw = raw if isinstance(raw, list) else [raw] if raw else []
+                doc_codes = []
+                for value in raw:
+                    code = values.setdefault(value, len(values))
+                    doc_codes.append(code)
+                    postings[value].add(i)
+                codes.append(doc_codes)
+            self.keyword_values[field] = list(values)
+            self.keyword_codes[field] = codes
+            self.keyword_postings[field] = postings
+
+        # Colonnes numériques et dates (epoch ms)
+        self.numeric = {field: [doc.get(field) for doc in docs] for field in NUMERIC_FIELDS}
+        for field in DATE_FIELDS:
+            self.numeric[field] = [parse_date(doc.get(field)) for doc in docs]
+
+        # Autocomplétion : valeurs triées par forme repliée
+        sources = {"titres": "title", "auteurs": "authors", "editeurs": "editeur"}
+        self.suggestions = {}
+        for name, field in sources.items():
+            values = set()
+            for doc in docs:
+                raw = doc.get(field)
+                values.update(raw if isinstance(raw, list) else [raw] if raw else [])
+            self.suggestions[name] = sorted((fold(v), v) for v in values)
+
+    @classmethod
+    def from_fixtures(cls, path: str = None) -> "MemoryClient":
+        """Charge le catalogue depuis un fichier JSON (liste de documents)."""
+        with open(path or DEFAULT_FIXTURES, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_mongo(cls, mongo_uri: str = None) -> "MemoryClient":
+        """Charge le catalogue depuis la collection MongoDB du scraper."""
+        from urllib.parse import urlparse
+        from pymongo import MongoClient
+
+        mongo_uri = mongo_uri or os.getenv("MONGO_URI", "mongodb://localhost:27017/cairn")
+        db_name = urlparse(mongo_uri).path.lstrip("/") or "cairn"
+        client = MongoClient(mongo_uri)
+        try:
+            docs = list(client[db_name]["ouvrages"].find({}, {"_id": 0}))
+        finally:
+            client.close()
+        return cls(docs)
+
+    # === Recherche ===
+
+    def _expand(self, term: str) -> tuple[tuple[str, float], ...]:
+        """Termes du vocabulaire à distance AUTO de `term`, avec leur poids
+        (mémorisés pour cette instance : le vocabulaire lui est propre)."""
+        expansions = self._expansions.get(term)
+        if expansions is None:
+            expansions = self._expansions[term] = self._compute_expansions(term)
+            while len(self._expansions) > EXPANSION_CACHE_SIZE:
+                # Les plus anciennes d'abord (ordre d'insertion du dict)
+                self._expansions.pop(next(iter(self._expansions)), None)
+        return expansions
+
+    def _compute_expansions(self, term: str) -> tuple[tuple[str, float], ...]:
+        limit = max_edits(term)
+        expansions = []
+        for length in range(len(term) - limit, len(term) + limit + 1):
+            for candidate in self.vocabulary.get((term[0], length), ()):
+                distance = 0 if candidate == term else edit_distance(term, candidate, limit)
+                if distance <= limit:
+                    expansions.append((candidate, 1 - distance / max(len(term), 1)))
+        return tuple(expansions)
+
+    def _score(self, query: str, candidates: Optional[set[int]], fuzzy: bool = True) -> dict[int, float]:
+        """Score BM25 `best_fields` (max sur les champs) des documents, termes
+        proches compris si `fuzzy` (plans "fuzzy" et "exact" de ESClient)."""
+        n = len(self.docs)
+        terms = tokenize(query)
+        field_scores = defaultdict(lambda: defaultdict(float))
+
+        for field, boost in TEXT_FIELDS.items():
+            postings = self.postings[field]
+            lengths = self.lengths[field]
+            avg = self.avg_lengths[field]
+            for term in terms:
+                best = defaultdict(float)
+                for expanded, weight in (self._expand(term) if fuzzy else ((term, 1.0),)):
+                    docs = postings.get(expanded)
+                    if not docs:
+                        continue
+                    idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for i, tf in docs.items():
+                        if candidates is not None and i not in candidates:
+                            continue
+                        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / avg)
+                        score = weight * idf * tf * (BM25_K1 + 1) / norm
+                        if score > best[i]:
+                            best[i] = score
+                for i, score in best.items():
+                    field_scores[field][i] += boost * score
+
+        # Les auteurs sont un champ keyword : la requête entière doit
+        # correspondre à un nom (à la casse et aux fautes près)
+        folded = fold(query.strip())
+        limit = max_edits(folded) if fuzzy else 0
+        for value, docs in self.keyword_postings["authors"].items():
+            if edit_distance(folded, fold(value), limit) <= limit:
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for i in docs:
+                    if candidates is None or i in candidates:
+                        field_scores["authors"][i] = max(field_scores["authors"][i], idf)
+
+        scores = defaultdict(float)
+        for per_doc in field_scores.values():
+            for i, score in per_doc.items():
+                scores[i] = max(scores[i], score)
+        return scores
+
+    def _matching(self, filters: Optional[dict]) -> Optional[set[int]]:
+        """Documents satisfaisant les filtres (None = tous)."""
+        matching = None
+        for field, values in (filters or {}).items():
+            if not values:
+                continue
+            if isinstance(values, dict):
+                subset = self._range(field, values)
+            else:
+                postings = self.keyword_postings.get(field, {})
+                subset = set().union(*(postings.get(v, set()) for v in values))
+            matching = subset if matching is None else matching & subset
+        return matching
+
+    def _range(self, field: str, bounds: dict) -> set[int]:
+        column = self.numeric[field]
+        is_date = field in DATE_FIELDS
+
+        def bound(key):
+            value = bounds.get(key)
+            if value is None or not is_date:
+                return value
+            parsed = parse_date(value)
+            # Comme ES : pour "lte" et "gt", les parties manquantes d'une date
+            # incomplète sont complétées par leur minimum, sauf l'heure, portée
+            # à la fin du jour ("2015" -> 2015-01-01T23:59:59.999)
+            if key in ("lte", "gt") and re.fullmatch(r"\d{4}", str(value)):
+                return parsed + DAY_MS - 1
+            return parsed
+
+        gte, gt, lte, lt = bound("gte"), bound("gt"), bound("lte"), bound("lt")
+        return {
+            i for i, v in enumerate(column)
+            if v is not None
+            and (gte is None or v >= gte) and (gt is None or v > gt)
+            and (lte is None or v <= lte) and (lt is None or v < lt)
+        }
+
+    def _ranked(
+        self, query: str, filters: Optional[dict], plan: Optional[str] = None
+    ) -> tuple[list[tuple[float, int]], str]:
+        """
+        Documents correspondants triés comme ESClient (score, puis date), et
+        plan retenu : "exact" s'il donne au moins PLANNER_MIN_HITS résultats,
+        sinon "fuzzy". Un plan "exact" ou "fuzzy" imposé est suivi tel quel.
+        """
+        candidates = self._matching(filters)
+        if not query.strip():
+            plan = "match_all"
+            scores = {i: 1.0 for i in (candidates if candidates is not None else range(len(self.docs)))}
+        elif plan == "fuzzy":
+            scores = self._score(query, candidates)
+        else:
+            scores = self._score(query, candidates, fuzzy=False)
+            if plan != "exact" and len(scores) < PLANNER_MIN_HITS:
+                plan, scores = "fuzzy", self._score(query, candidates)
+            else:
+                plan = "exact"
+        dates = self.numeric["date_parution"]
+        ranked = sorted(
+            ((score, i) for i, score in scores.items()),
+            key=lambda item: (-item[0], dates[item[1]] is None, -(dates[item[1]] or 0)),
+        )
+        return ranked, plan
+
+    def _snippet(self, doc: dict, query: str) -> list[str]:
+        """Extrait de description, mots de la requête en gras."""
+        text = doc.get("description") or ""
+        if not text:
+            return []
+        stems = set(tokenize(query))
+        words = list(re.finditer(r"\w+", text))
+        matches = [m for m in words if stems and stem(fold(m.group())) in stems]
+
+        start = max(0, matches[0].start() - SNIPPET_SIZE // 4) if matches else 0
+        end = min(len(text), start + SNIPPET_SIZE)
+        if start:
+            start = text.find(" ", start) + 1
+        if end < len(text):
+            space = text.rfind(" ", start, end)
+            if space > start:
+                end = space
+
+        fragment, cursor = [], start
+        for m in matches:
+            if start <= m.start() and m.end() <= end:
+                fragment.append(text[cursor:m.start()])
+                fragment.append(f"**{m.group()}**")
+                cursor = m.end()
+        fragment.append(text[cursor:end])
+        return ["".join(fragment)]
+
+    def search(
+        self,
+        query: str = "",
+        filters: Optional[dict[str, list[str]]] = None,
+        page: int = 1,
+        size: int = 20,
+        source_fields: Optional[list[str]] = CARD_FIELDS,
+        doc_store: Optional[DocumentStore] = None,
+    ) -> dict:
+        """Cf. ESClient.search."""
+        ranked, plan = self._ranked(query, filters)
+        hits = []
+        for score, i in ranked[(page - 1) * size:page * size]:
+            doc = self.docs[i]
+            source = doc if source_fields is None else {
+                field: doc[field] for field in source_fields if field in doc
+            }
+            hits.append({
+                "_id": self.ids[i],
+                "_score": score,
+                "_source": source,
+                "highlight": {"description": self._snippet(doc, query)},
+            })
+            if doc_store is not None:
+                doc_store.put(self.ids[i], doc)
+        return {"total": len(ranked), "hits": hits, "plan": plan}
+
+    def iter_batches(
+        self,
+        query: str = "",
+        filters: Optional[dict] = None,
+        batch_size: int = 1000,
+        keep_alive: str = None,
+        plan: Optional[str] = None,
+    ) -> Iterator[list[dict]]:
+        """Cf. ESClient.iter_batches."""
+        if query.strip():
+            ranked, _ = self._ranked(query, filters, plan)
+            matching = [i for _, i in ranked]
+        else:
+            candidates = self._matching(filters)
+            matching = sorted(candidates) if candidates is not None else range(len(self.docs))
+        batch = []
+        for i in matching:
+            batch.append(self.docs[i])
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def suggest(self, prefix: str, size: int = 5) -> dict[str, list[str]]:
+        """Cf. ESClient.suggest."""
+        suggestions = {name: [] for name in SUGGEST_FIELDS}
+        folded = fold(prefix.strip())
+        if len(folded) < 2:
+            return suggestions
+        for name, values in self.suggestions.items():
+            start = bisect.bisect_left(values, (folded, ""))
+            for key, value in values[start:start + size]:
+                if not key.startswith(folded):
+                    break
+                suggestions[name].append(value)
+        return suggestions
+
+    # === Documents ===
+
+    def get_by_id(self, doc_id: str) -> Optional[dict]:
+        """Cf. ESClient.get_by_id."""
+        i = self.positions.get(doc_id)
+        return self.docs[i] if i is not None else None
+
+    def get_many(self, doc_ids: list[str]) -> dict[str, dict]:
+        """Cf. ESClient.get_many."""
+        return {
+            doc_id: self.docs[self.positions[doc_id]]
+            for doc_id in doc_ids if doc_id in self.positions
+        }
+
+    def get_similar(self, doc_id: str) -> list[dict]:
+        """Pas de voisins précalculés en mode embarqué."""
+        return []
+
+    def get_stats_snapshot(self) -> Optional[dict]:
+        """Pas d'instantané : les agrégations en mémoire sont immédiates."""
+        return None
+
+    def get_crawl_runs(self, size: int = 200) -> list[dict]:
+        """Pas d'historique de crawl en mode embarqué."""
+        return []
+
+    # === Agrégations ===
+
+    def get_count(self, filters: Optional[dict] = None) -> int:
+        """Cf. ESClient.get_count."""
+        matching = self._matching(filters)
+        return len(self.docs) if matching is None else len(matching)
+
+    def get_aggregations(
+        self,
+        filters: Optional[dict[str, list[str]]] = None,
+        names: Optional[list[str]] = None,
+        raise_errors: bool = False,
+    ) -> dict:
+        """
+        Cf. ESClient.get_aggregations : interprète les définitions de
+        AGGREGATIONS (terms, histogram, date_histogram annuel) sur les
+        colonnes en mémoire.
+        """
+        matching = self._matching(filters)
+        docs = range(len(self.docs)) if matching is None else sorted(matching)
+        names = list(AGGREGATIONS) if names is None else names
+        result = {name: [] for name in AGGREGATIONS}
+
+        for name in names:
+            kind, params = next(iter(AGGREGATIONS[name].items()))
+            field = params["field"]
+            if kind == "terms":
+                result[name] = self._terms(field, docs)[:params["size"]]
+            elif kind == "histogram":
+                interval = params["interval"]
+                counts = Counter(
+                    math.floor(v / interval) * interval
+                    for v in (self.numeric[field][i] for i in docs) if v is not None
+                )
+                result[name] = [
+                    {"key": float(key), "doc_count": count}
+                    for key, count in sorted(counts.items())
+                ]
+            elif kind == "date_histogram":
+                counts = Counter(
+                    datetime.fromtimestamp(v / 1000, timezone.utc).year
+                    for v in (self.numeric[field][i] for i in docs) if v is not None
+                )
+                result[name] = [
+                    {"key_as_string": str(year), "key": year_start(year), "doc_count": count}
+                    for year, count in sorted(counts.items())
+                ]
+        return result
+
+    def _terms(self, field: str, docs) -> list[dict]:
+        """Buckets {key, doc_count} triés par nombre décroissant puis par clé."""
+        codes = self.keyword_codes[field]
+        counts = Counter(code for i in docs for code in set(codes[i]))
+        values = self.keyword_values[field]
+        return [
+            {"key": values[code], "doc_count": count}
+            for code, count in sorted(counts.items(), key=lambda c: (-c[1], values[c[0]]))
+        ]
+
+    def get_facet_page(
+        self,
+        field: str,
+        filters: Optional[dict[str, list[str]]] = None,
+        prefix: str = "",
+        after: Optional[dict] = None,
+        size: int = 20,
+    ) -> dict:
+        """Cf. ESClient.get_facet_page (ordre alphabétique, reprise par clé)."""
+        matching = self._matching(filters)
+        docs = range(len(self.docs)) if matching is None else matching
+        prefix = prefix.strip().lower()
+        buckets = sorted(
+            (b for b in self._terms(field, docs) if b["key"].lower().startswith(prefix)),
+            key=lambda b: b["key"],
+        )
+        if after:
+            keys = [b["key"] for b in buckets]
+            buckets = buckets[bisect.bisect_right(keys, after["key"]):]
+        page = buckets[:size]
+        after_key = {"key": page[-1]["key"]} if len(buckets) > size else None
+        return {"buckets": page, "after_key": after_key}
+
+
+def load_memory_client() -> MemoryClient:
+    """
+    Crée le client embarqué depuis la source configurée :
+    MEMORY_SOURCE=mongo, ou un chemin vers un fichier JSON (fixtures par défaut).
+    """
+    source = os.getenv("MEMORY_SOURCE", "")
+    if source == "mongo":
+        return MemoryClient.from_mongo()
+    return MemoryClient.from_fixtures(source or None)
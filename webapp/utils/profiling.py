@@ -0,0 +1,128 @@
+"""
+Profilage par échantillonnage des reruns Streamlit (PROFILE=1).
+Pendant chaque rerun, un thread relève la pile du thread d'exécution du
+script toutes les PROFILE_INTERVAL_MS et compte les piles identiques :
+rien n'est tracé entre deux relevés, le surcoût ne dépend que de
+l'intervalle. Les piles cumulées de chaque page sont réécrites après chaque
+rerun au format « folded » (flamegraph.pl, inferno, speedscope) dans
+PROFILE_DIR, et la répartition par catégorie s'affiche dans le panneau de
+diagnostic.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+ENABLED = os.getenv("PROFILE", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 10)) / 1000
+MAX_DEPTH = 128
+
+# La première catégorie reconnue dans la pile l'emporte : un appel
+# Elasticsearch fait depuis un graphique compte pour « ESClient ».
+CATEGORIES = [
+    ("ESClient", ("utils/es_client.py",)),
+    ("moteur embarqué", ("utils/memory_client.py",)),
+    ("couvertures", ("utils/covers.py",)),
+    ("graphiques (pandas/Plotly)", ("utils/charts.py", "/plotly/", "/pandas/")),
+    ("cache Streamlit", ("/streamlit/runtime/caching/",)),
+    ("rendu Streamlit", ("/streamlit/",)),
+]
+
+_lock = threading.Lock()
+_stacks = defaultdict(Counter)
+_categories = defaultdict(Counter)
+_overhead = defaultdict(float)
+_elapsed = defaultdict(float)
+
+
+def _category(paths: list[str]) -> str:
+    for name, markers in CATEGORIES:
+        if any(marker in path for path in paths for marker in markers):
+            return name
+    return "autre"
+
+
+def _sample(thread_id: int, stop: threading.Event, stacks: Counter, categories: Counter) -> float:
+    """Relève la pile de `thread_id` jusqu'à `stop` ; renvoie le temps passé à échantillonner."""
+    overhead = 0.0
+    while not stop.wait(INTERVAL):
+        start = time.perf_counter()
+        frame = sys._current_frames().get(thread_id)
+        paths, labels = [], []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            code = frame.f_code
+            paths.append(f"{code.co_filename}:{code.co_qualname}")
+            labels.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+            frame = frame.f_back
+        if labels:
+            stacks[";".join(reversed(labels))] += 1
+            categories[_category(paths)] += 1
+        overhead += time.perf_counter() - start
+    return overhead
+
+
+@contextmanager
+def profile_rerun(page: str):
+    """
+    Échantillonne la pile du thread courant le temps du bloc.
+
+    Args:
+        page: Nom de la page (un fichier .folded par page)
+    """
+    if not ENABLED:
+        yield
+        return
+
+    stacks, categories = Counter(), Counter()
+    stop = threading.Event()
+    result = {}
+    thread_id = threading.get_ident()
+    sampler = threading.Thread(
+        target=lambda: result.update(overhead=_sample(thread_id, stop, stacks, categories)),
+        name="stack-sampler",
+        daemon=True,
+    )
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        sampler.join()
+        with _lock:
+            _stacks[page].update(stacks)
+            _categories[page].update(categories)
+            _overhead[page] += result.get("overhead", 0.0)
+            _elapsed[page] += time.perf_counter() - started
+            _write_folded(page)
+
+
+def _write_folded(page: str) -> None:
+    slug = re.sub(r"[^\w-]+", "_", page).strip("_").lower() or "page"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"webapp-{slug}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in _stacks[page].most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def summary() -> list[dict]:
+    """Répartition des échantillons par page et par catégorie."""
+    rows = []
+    with _lock:
+        for page, categories in sorted(_categories.items()):
+            total = sum(categories.values()) or 1
+            overhead = 100 * _overhead[page] / _elapsed[page] if _elapsed[page] else 0
+            for name, count in categories.most_common():
+                rows.append({
+                    "page": page,
+                    "catégorie": name,
+                    "temps (%)": round(100 * count / total, 1),
+                    "échantillons": count,
+                    "surcoût (%)": round(overhead, 2),
+                })
+    return rows
@@ -0,0 +1,111 @@
+"""
+Instrumentation des requêtes Elasticsearch.
+Chaque appel de ESClient est mesuré (durée réelle, `took` côté ES, taille
+de la réponse, nombre de résultats) et alimente des fenêtres glissantes par
+méthode ; les requêtes au-delà d'un seuil sont journalisées avec leur body.
+L'enregistrement est en O(1) : les percentiles ne sont calculés qu'à la
+demande, par le panneau de diagnostic.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Seuil (ms) au-delà duquel une requête est journalisée
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+# Nombre de mesures conservées par méthode pour les percentiles
+WINDOW_SIZE = 1000
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class QueryRecorder:
+    """Mesures glissantes par méthode et journal des requêtes lentes."""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, window: int = WINDOW_SIZE):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._calls = defaultdict(int)
+        self.slow_queries = deque(maxlen=50)
+
+    def record(self, method: str, wall_ms: float, response, body: Optional[dict] = None) -> None:
+        """
+        Enregistre un appel à Elasticsearch.
+
+        Args:
+            method: Méthode de ESClient à l'origine de l'appel
+            wall_ms: Durée mesurée côté client
+            response: Réponse Elasticsearch
+            body: Body de la requête (journalisé si elle est lente)
+        """
+        payload = getattr(response, "body", response)
+        took = payload.get("took")
+        hits = None
+        if "hits" in payload:
+            hits = len(payload["hits"]["hits"])
+        elif "docs" in payload:
+            hits = sum(1 for doc in payload["docs"] if doc.get("found"))
+        elif "count" in payload:
+            hits = payload["count"]
+        elif "found" in payload:
+            hits = int(payload["found"])
+
+        meta = getattr(response, "meta", None)
+        size = meta.headers.get("content-length") if meta is not None else None
+        size = int(size) if size else None
+
+        sample = (wall_ms, took, size, hits)
+        with self._lock:
+            self._samples[method].append(sample)
+            self._calls[method] += 1
+
+        if wall_ms >= self.slow_ms:
+            entry = {
+                "time": time.strftime("%H:%M:%S"),
+                "method": method,
+                "wall_ms": round(wall_ms, 1),
+                "took_ms": took,
+                "body": body,
+            }
+            self.slow_queries.append(entry)
+            logger.warning(
+                "Requête lente %s : %.0f ms (took=%s ms) %s",
+                method, wall_ms, took, json.dumps(body, ensure_ascii=False, default=str),
+            )
+
+    def summary(self) -> list[dict]:
+        """Statistiques par méthode sur la fenêtre glissante."""
+        with self._lock:
+            snapshot = {method: list(samples) for method, samples in self._samples.items()}
+            calls = dict(self._calls)
+
+        rows = []
+        for method, samples in sorted(snapshot.items()):
+            walls = [s[0] for s in samples]
+            tooks = [s[1] for s in samples if s[1] is not None]
+            sizes = [s[2] for s in samples if s[2] is not None]
+            hits = [s[3] for s in samples if s[3] is not None]
+            rows.append({
+                "méthode": method,
+                "appels": calls[method],
+                "p50 (ms)": round(percentile(walls, 50), 1),
+                "p95 (ms)": round(percentile(walls, 95), 1),
+                "p99 (ms)": round(percentile(walls, 99), 1),
+                "took moyen (ms)": round(sum(tooks) / len(tooks), 1) if tooks else None,
+                "réponse moy. (Ko)": round(sum(sizes) / len(sizes) / 1024, 1) if sizes else None,
+                "résultats moy.": round(sum(hits) / len(hits), 1) if hits else None,
+            })
+        return rows
+
+
+# Instance partagée par tous les clients du processus
+RECORDER = QueryRecorder()